@@ -0,0 +1,30 @@
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.core.security import InvalidToken, verify_token
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Dict[str, Any]:
+    """
+    Dependency for protected routes: the verified claims of the request's bearer token
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        return verify_token(credentials.credentials)
+    except InvalidToken as e:
+        raise HTTPException(
+            status_code=401,
+            detail=str(e),
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'}
+        )
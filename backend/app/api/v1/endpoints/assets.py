@@ -0,0 +1,169 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from app.api.deps import get_current_claims
+from app.core.config import settings
+from app.core.executors import run_in_thread_pool
+from app.core.uploads import ingest_upload, UploadTooLarge
+from app.services.assets import blob_store, asset_url, sniff_content_type, AssetNotFound
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+# Blobs never change once written, so clients and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) for a single "bytes=" range, or None to serve the whole
+    body (no header, or several ranges, which we may ignore)
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if start_text == "":
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Weak comparison against an If-None-Match list
+    """
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def iter_blob(sha256: str, start: int, length: int) -> AsyncIterator[bytes]:
+    blob = await run_in_thread_pool(blob_store.open, sha256)
+    try:
+        await run_in_thread_pool(blob.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await run_in_thread_pool(blob.read, min(settings.ASSET_STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        blob.close()
+
+
+@router.get("/stats/", include_in_schema=False)
+async def asset_stats():
+    return blob_store.stats()
+
+
+@router.post("/", status_code=201)
+async def upload_asset(
+    file: UploadFile = File(...),
+    claims: Dict[str, Any] = Depends(get_current_claims)
+):
+    """
+    Store a GLB model or image by content hash. Uploading the same bytes again
+    returns the existing asset. Requires a bearer token; reads stay public.
+    """
+    try:
+        upload = await ingest_upload(file, max_bytes=settings.ASSET_MAX_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        content_type = sniff_content_type(upload.rewind().read(12))
+        allowed = [item.strip() for item in settings.ASSET_ALLOWED_TYPES.split(",")]
+        if content_type not in allowed:
+            raise HTTPException(status_code=415, detail=f"Unsupported asset type; expected one of {allowed}")
+        info = await run_in_thread_pool(blob_store.put, upload.rewind(), upload.sha256)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error storing asset: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        upload.close()
+
+    logger.info(f"Stored asset {info.sha256} ({info.size} bytes) for user_id={claims.get('user_id')}")
+
+    return {
+        "sha256": info.sha256,
+        "size": info.size,
+        "content_type": info.content_type,
+        "url": asset_url(info.sha256)
+    }
+
+
+@router.api_route("/{sha256}", methods=["GET", "HEAD"])
+async def get_asset(sha256: str, request: Request):
+    """
+    Serve an asset with a strong ETag, immutable caching and single byte-range
+    support, so large GLB files can load incrementally and resume
+    """
+    try:
+        info = await run_in_thread_pool(blob_store.stat, sha256)
+    except AssetNotFound:
+        raise HTTPException(status_code=404, detail="Asset not found")
+
+    etag = f'"{info.sha256}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    # A Range is only honoured if the client's copy is still this one
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), info.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{info.size}"})
+
+    status_code = 200
+    start, end = 0, info.size - 1
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    length = max(0, end - start + 1)
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=info.content_type)
+
+    return StreamingResponse(
+        iter_blob(info.sha256, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type=info.content_type
+    )
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.auth import LoginRequest, LoginResponse
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Dict
+from app.api.deps import get_current_claims
+from app.core.security import claims_cache
+from app.schemas.auth import LoginRequest, LoginResponse, TokenClaims
 from app.services.auth import AuthService
 
 router = APIRouter()
@@ -12,4 +15,18 @@ async def login(request: LoginRequest):
     try:
         return await AuthService.login(request.username, request.password)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/me", response_model=TokenClaims)
+async def me(claims: Dict[str, Any] = Depends(get_current_claims)):
+    """
+    The claims of the caller's bearer token
+    """
+    return claims
+
+@router.get("/cache/stats/")
+async def claims_cache_stats():
+    """
+    Hit ratio of the verified-claims cache
+    """
+    return claims_cache.stats()
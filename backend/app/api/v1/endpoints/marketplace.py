@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from app.schemas.marketplace import MarketplacePage
+from app.services.marketplace import MarketplaceService, InvalidMarketplaceQuery
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+@router.get("/", response_model=MarketplacePage)
+async def list_marketplace(
+    exclude_owner: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_rarity: Optional[int] = Query(None, ge=1, le=5),
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    max_score: Optional[float] = Query(None, ge=0, le=100),
+    score: List[str] = Query([], description="Parameter score range as name:min:max, e.g. wilting:70:"),
+    sort_by: str = Query("created_at", pattern="^(price|score|created_at)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    List marketplace models with filtering, sorting and cursor pagination
+    """
+    try:
+        query = MarketplaceService.build_query(
+            exclude_owner=exclude_owner,
+            min_price=min_price,
+            max_price=max_price,
+            min_rarity=min_rarity,
+            min_score=min_score,
+            max_score=max_score,
+            score_filters=score
+        )
+        items, next_cursor = await MarketplaceService.list_models(
+            query,
+            sort_by=sort_by,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor
+        )
+        return MarketplacePage(items=items, next_cursor=next_cursor)
+    except InvalidMarketplaceQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing marketplace: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
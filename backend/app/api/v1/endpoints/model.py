@@ -1,105 +1,388 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Header, Response
+from fastapi.responses import StreamingResponse
 from app.schemas.model import ModelResponse
-from app.services.model import ModelService
+from app.services.model import ModelService, vision_admission
+from app.core.admission import AdmissionRejected
+from app.services.image_gate import ImageRejected, gate_stats
+import math
+from app.services.mint_jobs import MintJobService, serialize_job
+from app.services.analysis_cache import analysis_cache
+from app.services.near_duplicates import near_duplicate_index
+from app.services.mint_batcher import mint_batcher, decimal_string
+from app.services.prompts import prompt_stats
+from app.services.analyses import analysis_writer
+from app.services.idempotency import (
+    idempotency, idempotency_key, request_fingerprint, IdempotencyConflict, IdempotencyInProgress
+)
+from functools import partial
 import json
-from typing import Dict, Any
-from pydantic import BaseModel, ValidationError
-import httpx
+import asyncio
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, ValidationError, field_validator
 from app.core.config import settings
+from app.core.uploads import ingest_upload, UploadTooLarge
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 class PlantMetadata(BaseModel):
     glb_file_url: str
     parameters: Dict[str, Any]
     name: str
     wallet_id: str
-    price: float
+    # yoctoNEAR, kept as a decimal string because floats lose precision past 2**53
+    price: str
+
+    @field_validator("price", mode="before")
+    @classmethod
+    def price_as_decimal_string(cls, value: Any) -> str:
+        return decimal_string(value)
 
 class MintRequest(BaseModel):
     token_id: str
     receiver_id: str
     plant_metadata: PlantMetadata
 
-@router.post("/mint/")
+@router.post("/mint/", status_code=202)
 async def mint_nft(request: MintRequest):
+    """
+    Queue an NFT mint and return its job id straight away. Minting the same
+    token_id twice returns the original job.
+    """
     try:
         # Log the full request for debugging
-        print("Received mint request body:", request.dict())
+        logger.info("Received mint request body: %s", request.dict())
 
-        # Call the ModelService to handle the minting
-        response = await ModelService.mint_nft(
+        job = await MintJobService.enqueue(
             token_id=request.token_id,
             receiver_id=request.receiver_id,
             plant_metadata=request.plant_metadata.dict()
         )
 
-        # Return the response from the service
         return {
             "success": True,
-            "message": "NFT minted successfully",
-            "data": {
-                "transaction_hash": response["transaction_hash"],
-                "token_id": response["token_id"],
-                "receiver": response["receiver"],
-                "metadata": response["metadata"]
-            }
+            "message": "NFT mint queued",
+            "data": serialize_job(job)
         }
 
     except ValidationError as e:
-        print("Validation error:", str(e))
+        logger.error("Validation error: %s", str(e))
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        print("Error in mint_nft:", str(e))
+        logger.error("Error in mint_nft: %s", str(e))
         # Include more error details in response
-        error_msg = f"Failed to mint NFT: {str(e)}"
-        print(error_msg)
+        error_msg = f"Failed to queue NFT mint: {str(e)}"
+        logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+@router.get("/mint/{job_id}")
+async def get_mint_job(job_id: str):
+    """
+    Get the status of a mint job
+    """
+    try:
+        job = await MintJobService.get_job(job_id)
+    except Exception as e:
+        logger.error("Error in get_mint_job: %s", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Mint job not found")
+    return serialize_job(job)
+
 @router.post("/new/", response_model=ModelResponse)
 async def new_model(
+    response: Response,
     userId: str = Form(...),
     imageUrl: str = Form(...),
     model_name: str = Form(''),
     model_description: str = Form(''),
     model_image_url: str = Form(''),
     model_image_file: UploadFile = File(None),
-    model_attributes: str = Form('{}')
+    model_attributes: str = Form('{}'),
+    idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
-    Create a new model
+    Create a new model. Retries carrying the same Idempotency-Key (or, without
+    one, the same upload and fields) attach to the analysis already in flight or
+    replay its result; those responses carry Idempotent-Replayed: true.
     """
+    model_image = None
     try:
         # Convert model_attributes from JSON string to dict
         model_attributes_dict = json.loads(model_attributes)
         
         # Log received data
-        print(f"Received data: userId={userId}, imageUrl={imageUrl}, model_name={model_name}")
+        logger.info(f"Received data: userId={userId}, imageUrl={imageUrl}, model_name={model_name}")
         if model_image_file:
-            print(f"Received image file: {model_image_file.filename}")
+            logger.info(f"Received image file: {model_image_file.filename}")
+            model_image = await ingest_upload(model_image_file)
 
-        result = await ModelService.create_model(
+        create = partial(
+            ModelService.create_model,
             userId=userId,
             imageUrl=imageUrl,
             model_name=model_name,
             model_description=model_description,
             model_image_url=model_image_url,
-            model_image_file=model_image_file,
+            model_image=model_image,
             model_attributes=model_attributes_dict
         )
 
+        key = None
+        if settings.IDEMPOTENCY_ENABLED:
+            fingerprint = request_fingerprint(
+                userId=userId,
+                imageUrl=imageUrl,
+                model_name=model_name,
+                model_description=model_description,
+                model_image_url=model_image_url,
+                model_attributes=model_attributes_dict,
+                image_sha256=model_image.sha256 if model_image else None
+            )
+            key = idempotency_key(userId, idempotency_key_header, fingerprint, model_image is not None)
+
+        if key is None:
+            result = await create()
+        else:
+            # The coordinator owns the upload from here: the shared analysis may
+            # outlive this request if the client disconnects and retries
+            image, model_image = model_image, None
+            result, shared = await idempotency.run(
+                key,
+                fingerprint,
+                create,
+                image.close if image else (lambda: None)
+            )
+            if shared:
+                response.headers["Idempotent-Replayed"] = "true"
+
         # Return the full response including all the analysis data
         return ModelResponse(
             success=result["success"],
             message=result["message"],
+            id=result.get("model_id"),
             api1_data=result.get("api1_data"),
             api2_data=result.get("api2_data"),
             gpt_analysis=result.get("gpt_analysis"),
             combined_score=result.get("combined_score")
         )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImageRejected as e:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": str(e), "reasons": e.reasons, "metrics": e.metrics}
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(
+            status_code=409,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
     except Exception as e:
-        print(f"Error creating model: {str(e)}")
+        logger.error(f"Error creating model: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if model_image:
+            model_image.close()
+
+@router.post("/new/stream/")
+async def new_model_stream(
+    userId: str = Form(...),
+    imageUrl: str = Form(...),
+    model_name: str = Form(''),
+    model_description: str = Form(''),
+    model_image_url: str = Form(''),
+    model_image_file: UploadFile = File(None),
+    model_attributes: str = Form('{}')
+):
+    """
+    Same as /new/ but answers with Server-Sent Events as each stage completes:
+    upload_received, preprocessed, gate_passed (not sent for cached analyses),
+    local_score, token (streamed LLM output), analysis and finally result. Failures end the stream with an error
+    event carrying the status code /new/ would have returned.
+    """
+    try:
+        model_attributes_dict = json.loads(model_attributes)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid model_attributes: {str(e)}")
+
+    model_image = None
+    if model_image_file:
+        try:
+            model_image = await ingest_upload(model_image_file)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def progress(event: str, data: Dict[str, Any]):
+        await events.put(sse_event(event, data))
+
+    async def run():
+        try:
+            result = await ModelService.create_model(
+                userId=userId,
+                imageUrl=imageUrl,
+                model_name=model_name,
+                model_description=model_description,
+                model_image_url=model_image_url,
+                model_image=model_image,
+                model_attributes=model_attributes_dict,
+                progress=progress
+            )
+            await progress("result", ModelResponse(
+                success=result["success"],
+                message=result["message"],
+                id=result.get("model_id"),
+                api1_data=result.get("api1_data"),
+                api2_data=result.get("api2_data"),
+                gpt_analysis=result.get("gpt_analysis"),
+                combined_score=result.get("combined_score")
+            ).model_dump())
+        except ImageRejected as e:
+            await progress("error", {"status": 422, "message": str(e), "reasons": e.reasons, "metrics": e.metrics})
+        except AdmissionRejected as e:
+            await progress("error", {"status": 503, "message": str(e), "retry_after": math.ceil(e.retry_after)})
+        except Exception as e:
+            logger.error(f"Error creating model: {str(e)}")
+            await progress("error", {"status": 500, "message": str(e)})
+        finally:
+            await events.put(None)
+
+    async def stream():
+        task = None
+        try:
+            yield sse_event("upload_received", {
+                "size": model_image.size if model_image else 0,
+                "filename": model_image.filename if model_image else None
+            })
+            task = asyncio.create_task(run())
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # The client may disconnect before the analysis finishes
+            if task is not None and not task.done():
+                task.cancel()
+            if model_image:
+                model_image.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/batch/")
+async def new_models_batch(
+    userId: str = Form(...),
+    imageUrl: str = Form(''),
+    files: List[UploadFile] = File(...),
+    model_attributes: str = Form('{}'),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """
+    Analyse many images in one request. Results stream back one per line (NDJSON)
+    or one per event (SSE) in completion order, followed by a summary.
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may contain at most {settings.BATCH_MAX_FILES} files"
+        )
+
+    try:
+        model_attributes_dict = json.loads(model_attributes)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid model_attributes: {str(e)}")
+
+    # Ingest everything up front: the request's own upload files are closed once
+    # this handler returns, while the stream below keeps running
+    model_images = []
+    positions = []
+    rejected = []
+    try:
+        for index, upload in enumerate(files):
+            try:
+                model_images.append(await ingest_upload(upload))
+                positions.append(index)
+            except UploadTooLarge as e:
+                rejected.append({"index": index, "filename": upload.filename, "success": False, "message": str(e)})
+    except Exception as e:
+        for image in model_images:
+            image.close()
+        logger.error(f"Error ingesting batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"Received batch of {len(files)} images from userId={userId}")
+
+    def encode(event: str, data: Dict[str, Any]) -> str:
+        if format == "sse":
+            return sse_event(event, data)
+        return json.dumps(data, default=str) + "\n"
+
+    async def stream():
+        succeeded = 0
+        try:
+            for item in rejected:
+                yield encode("result", item)
+
+            results = ModelService.create_models_batch(
+                userId=userId,
+                imageUrl=imageUrl,
+                model_images=model_images,
+                concurrency=settings.BATCH_CONCURRENCY,
+                model_attributes=model_attributes_dict
+            )
+            async for item in results:
+                item["index"] = positions[item["index"]]
+                succeeded += item["success"]
+                yield encode("result", item)
+
+            yield encode("done", {
+                "done": True,
+                "total": len(files),
+                "succeeded": succeeded,
+                "failed": len(files) - succeeded
+            })
+        finally:
+            for image in model_images:
+                image.close()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+@router.get("/stats/")
+async def model_stats():
+    """
+    Runtime counters for the analysis pipeline
+    """
+    return {
+        "analysis_cache": analysis_cache.stats(),
+        "near_duplicates": near_duplicate_index.stats(),
+        "mint_batcher": mint_batcher.stats(),
+        "prompts": prompt_stats(),
+        "analysis_writer": analysis_writer.stats(),
+        "vision_admission": vision_admission.stats(),
+        "image_gate": gate_stats.stats(),
+        "idempotency": idempotency.stats()
+    }
 
 
 # @router.get("/all/")
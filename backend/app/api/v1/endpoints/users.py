@@ -1,20 +1,50 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.core.config import settings
 from app.schemas.user import UserResponse
-from app.services.users import UserService
+from app.services.users import UserService, InvalidCursor, user_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=List[UserResponse])
-async def get_all_users():
+async def get_all_users(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    stream: bool = False
+):
     """
-    Get all users
+    Get users in pages ordered by id. Pass the X-Next-Cursor header of one page
+    as `after` to fetch the next. With stream=true every remaining user is
+    streamed as NDJSON instead.
     """
     try:
-        return await UserService.get_all_users()
+        if stream:
+            return StreamingResponse(
+                UserService.stream_users(after, batch_size=settings.USERS_STREAM_BATCH_SIZE),
+                media_type="application/x-ndjson"
+            )
+
+        users, next_cursor = await UserService.get_all_users(limit=limit, after=after)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+            next_url = request.url.include_query_params(after=next_cursor, limit=limit)
+            response.headers["Link"] = f'<{next_url}>; rel="next"'
+        return users
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats/")
+async def user_cache_stats():
+    """
+    Hit ratio and load counters for the user cache
+    """
+    return user_cache.stats()
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(user_id: str):
     """
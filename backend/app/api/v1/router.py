@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import users, auth, model
+from app.api.v1.endpoints import users, auth, model, marketplace, assets
 
 api_router = APIRouter()
 
@@ -20,3 +20,15 @@ api_router.include_router(
     prefix="/model",
     tags=["model"]
 )
+
+api_router.include_router(
+    marketplace.router,
+    prefix="/marketplace",
+    tags=["marketplace"]
+)
+
+api_router.include_router(
+    assets.router,
+    prefix="/assets",
+    tags=["assets"]
+)
@@ -0,0 +1,213 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a call can't be admitted within the queue limits. Callers should
+    answer 503 with a Retry-After header.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Refills continuously at rate_per_minute, holding at most one minute's worth
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.tokens = float(rate_per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until amount tokens are available
+        """
+        self._refill(now)
+        # A single oversized request only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Read retry-after-ms or retry-after (seconds) from response headers
+    """
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class AdmissionTicket:
+    def __init__(self, controller: "AdmissionController", estimated_tokens: float):
+        self.controller = controller
+        self.estimated_tokens = estimated_tokens
+        self.admitted_at = time.monotonic()
+
+    def settle(self, actual_tokens: int):
+        """
+        Correct the token bucket once the real usage is known
+        """
+        self.controller.tokens.refund(self.estimated_tokens - actual_tokens)
+
+
+class AdmissionController:
+    """
+    Admission control for an upstream API with request and token rate limits.
+
+    A call is admitted once the RPM and TPM token buckets have room, no retry-after
+    pause is active, and fewer than `limit` calls are in flight. The concurrency
+    limit is AIMD: it grows by about one per `limit` successes and halves on a 429
+    or 5xx, at most once per round trip. Callers wait in a bounded queue for at most max_wait_seconds; when the
+    queue is full or the wait would be too long they are rejected immediately.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        max_queue: int = 64,
+        max_wait_seconds: float = 10.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self._changed: Optional[asyncio.Event] = None
+        self.admitted = 0
+        self.rejected = 0
+        self.overloads = 0
+        self.decreases = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_observed = 0.0
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    def _delay(self, estimated_tokens: float, now: float) -> Optional[float]:
+        """
+        Seconds until a call could be admitted, or None if it must wait for a release
+        """
+        if self.in_flight >= int(self.limit):
+            return None
+        return max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now),
+            0.0,
+        )
+
+    @asynccontextmanager
+    async def admit(self, estimated_tokens: float) -> AsyncIterator[AdmissionTicket]:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected("Vision queue is full", retry_after=self.max_wait_seconds)
+
+        started = time.monotonic()
+        deadline = started + self.max_wait_seconds
+        self.waiting += 1
+        try:
+            while True:
+                now = time.monotonic()
+                delay = self._delay(estimated_tokens, now)
+                if delay == 0:
+                    break
+                if delay is not None and now + delay > deadline:
+                    self.rejected += 1
+                    raise AdmissionRejected("Vision rate limit reached", retry_after=delay)
+                if now >= deadline:
+                    self.rejected += 1
+                    raise AdmissionRejected("Timed out waiting for vision capacity", retry_after=self.max_wait_seconds)
+
+                # Sleep until the buckets refill or another call finishes
+                timeout = deadline - now if delay is None else min(delay, deadline - now)
+                if self._changed is None:
+                    self._changed = asyncio.Event()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.waiting -= 1
+
+        self.requests.consume(1)
+        self.tokens.consume(estimated_tokens)
+        self.in_flight += 1
+        self.admitted += 1
+        waited = time.monotonic() - started
+        self.total_wait_seconds += waited
+        self.max_wait_observed = max(self.max_wait_observed, waited)
+
+        try:
+            yield AdmissionTicket(self, estimated_tokens)
+        finally:
+            self.in_flight -= 1
+            self._notify()
+
+    def on_success(self):
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def on_overload(self, retry_after: Optional[float] = None, admitted_at: Optional[float] = None):
+        """
+        Back off after a 429 or 5xx: halve the concurrency limit and, if the
+        upstream said when to retry, pause admissions until then. A call admitted
+        before the last decrease was sent under the old limit, so its failure does
+        not halve the limit again; a burst of 429s from one window counts once.
+        """
+        self.overloads += 1
+        if admitted_at is None or admitted_at >= self.last_decrease:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self.last_decrease = time.monotonic()
+            self.decreases += 1
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        self._notify()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "concurrency_limit": round(self.limit, 2),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+            "avg_wait_seconds": self.total_wait_seconds / self.admitted if self.admitted else 0.0,
+            "max_wait_seconds": self.max_wait_observed,
+            "paused_for_seconds": max(0.0, self.paused_until - time.monotonic()),
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Size-bounded in-memory LRU cache with optional TTL expiry and hit/miss counters
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for key, or default if it is missing or expired
+        """
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """
+        Store value under key, evicting the least recently used entries when full
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """
+        Remove key from the cache, returning whether it was present
+        """
+        return self._entries.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return False
+        expires_at = entry[1]
+        return expires_at is None or expires_at > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Keeps asyncio from reporting a failed load that every waiter has abandoned
+    if not task.cancelled():
+        task.exception()
+
+
+class ReadThroughCache:
+    """
+    Read-through cache for single-document lookups.
+
+    get() returns the cached value or calls loader(key), caching the result
+    (including "not found" as None, for a shorter negative TTL). Concurrent misses
+    for the same key share one in-flight load instead of each querying the
+    database. Writers call invalidate() after changing the underlying document.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Awaitable[Any]],
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 60,
+        negative_ttl_seconds: Optional[float] = 5,
+    ):
+        self.loader = loader
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+        self.loads = 0
+        self.coalesced = 0
+
+    async def get(self, key: Hashable) -> Any:
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The load runs in its own task, so a caller that is cancelled (e.g. its
+            # client disconnected) neither cancels it nor fails the other waiters
+            task = asyncio.create_task(self._load(key))
+            task.add_done_callback(_retrieve_exception)
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable) -> Any:
+        generation = self._generation
+        try:
+            self.loads += 1
+            value = await self.loader(key)
+        finally:
+            self._in_flight.pop(key, None)
+
+        # Don't cache a value loaded before an invalidation that happened mid-load
+        if generation == self._generation:
+            if value is not None:
+                self.cache.set(key, value)
+            elif self.negative_ttl_seconds:
+                self.cache.set(key, value, ttl_seconds=self.negative_ttl_seconds)
+        return value
+
+    def invalidate(self, key: Hashable):
+        """
+        Drop key so the next get() reloads it
+        """
+        self.cache.delete(key)
+        self._generation += 1
+
+    def clear(self):
+        self.cache.clear()
+        self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache.stats(),
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
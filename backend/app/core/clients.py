@@ -0,0 +1,94 @@
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+
+from .config import settings
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+class Clients:
+    http: Optional[httpx.AsyncClient] = None
+    openai: Optional["AsyncOpenAI"] = None
+
+
+def _http2_available() -> bool:
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+        return False
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """
+    Pooled client with keep-alive, so repeated calls reuse TCP/TLS connections
+    """
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            read=settings.HTTP_READ_TIMEOUT,
+            write=settings.HTTP_WRITE_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared client for outbound calls such as the NEAR mint service
+    """
+    if Clients.http is None:
+        Clients.http = build_http_client()
+    return Clients.http
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    """
+    Shared OpenAI client, backed by its own connection pool. Built on first use,
+    which is also when the (slow to import) openai package is loaded.
+    """
+    if Clients.openai is None:
+        from openai import AsyncOpenAI
+
+        Clients.openai = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            http_client=build_http_client(),
+        )
+    return Clients.openai
+
+
+async def init_clients():
+    """
+    Create the shared clients
+    """
+    get_http_client()
+    get_openai_client()
+
+
+async def close_clients():
+    """
+    Close the shared clients and their connection pools
+    """
+    if Clients.http is not None:
+        await Clients.http.aclose()
+        Clients.http = None
+    if Clients.openai is not None:
+        await Clients.openai.close()
+        Clients.openai = None
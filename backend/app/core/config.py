@@ -27,16 +27,192 @@ class Settings(BaseSettings):
     LANGSMITH_API_KEY: str
     LANGSMITH_PROJECT: str
     
+    # Auth tokens. New tokens are signed with SECRET_KEY; PREVIOUS_SECRET_KEYS is a
+    # comma-separated list of retired keys still accepted for verification, so a
+    # key can be rotated without logging everyone out
+    SECRET_KEY: str
+    PREVIOUS_SECRET_KEYS: str = ""
+    JWT_ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 24 * 60
+    JWT_LEEWAY_SECONDS: int = 0
+    # Verified claims are cached by token digest until the token expires, capped at the TTL
+    JWT_CLAIMS_CACHE_MAX_ENTRIES: int = 10000
+    JWT_CLAIMS_CACHE_TTL_SECONDS: float = 300.0
+
+    # Cold start: build clients and indexes in a background task after startup
+    # instead of before accepting requests, so Mongo reachability doesn't gate boot
+    LAZY_STARTUP: bool = False
+
+    # Logging and tracing
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    # Finished request traces are appended here as OTLP/JSON lines; empty disables export
+    TRACE_EXPORT_PATH: str = ""
+    METRICS_ENABLED: bool = True
+
     # OpenAI
     OPENAI_API_KEY: str
+    # Point at a compatible server (e.g. benchmarks.fakes) instead of api.openai.com
+    OPENAI_BASE_URL: str = ""
+    OPENAI_VISION_MODEL: str = "gpt-4o-mini"
+    # The analysis schema with five explanations needs well over 300 tokens
+    VISION_MAX_TOKENS: int = 1000
+    VISION_PARSE_ATTEMPTS: int = 2
+    # The SDK would retry 429s and 5xx while still holding the admission slot, so
+    # request_analysis retries them itself, after releasing the slot and backing off
+    OPENAI_MAX_RETRIES: int = 0
+    VISION_API_ATTEMPTS: int = 3
+    VISION_RETRY_BASE_SECONDS: float = 0.5
+    VISION_RETRY_MAX_SECONDS: float = 8.0
+
+    # Vision admission control, matched to the account's rate limits
+    OPENAI_RPM_LIMIT: int = 500
+    OPENAI_TPM_LIMIT: int = 200000
+    VISION_MAX_CONCURRENCY: int = 16
+    VISION_MIN_CONCURRENCY: int = 1
+    VISION_QUEUE_SIZE: int = 64
+    VISION_QUEUE_MAX_WAIT_SECONDS: float = 10.0
+
+    # Prompt versions live in app.services.prompts; optionally route a fraction of
+    # uploads to a second version for A/B comparison
+    PROMPT_VERSION: str = "v3"
+    PROMPT_AB_VERSION: str = ""
+    PROMPT_AB_FRACTION: float = 0.0
+
+    # Analysis cache
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 2048
+    ANALYSIS_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    ANALYSIS_CACHE_USE_MONGO: bool = False
+
+    # Content-addressed asset store for GLB models and plant images
+    ASSET_STORE_DIR: str = "data/assets"
+    ASSET_MAX_BYTES: int = 200 * 1024 * 1024
+    ASSET_ALLOWED_TYPES: str = "model/gltf-binary,image/jpeg,image/png,image/webp"
+    ASSET_STREAM_CHUNK_SIZE: int = 256 * 1024
+    # Also keep every analysed upload in the store and link it from the model document
+    ASSET_STORE_UPLOADS: bool = True
+
+    # Uploads
+    UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024
+    UPLOAD_SPOOL_THRESHOLD: int = 1024 * 1024
+    # Whole-body limits, enforced by BodySizeLimitMiddleware on Content-Length and
+    # while the body is read, before multipart parsing finishes. They allow 1 MB
+    # of form fields on top of the file limits above.
+    REQUEST_MAX_BYTES: int = 21 * 1024 * 1024
+    BATCH_REQUEST_MAX_BYTES: int = 201 * 1024 * 1024
+    ASSET_REQUEST_MAX_BYTES: int = 201 * 1024 * 1024
+
+    # Batch analysis
+    BATCH_MAX_FILES: int = 50
+    BATCH_CONCURRENCY: int = 4
+
+    # Vision image preprocessing. Low detail bills one flat rate per image; "auto"
+    # only pays for high detail when that costs at most VISION_AUTO_HIGH_DETAIL_MAX_TOKENS.
+    VISION_DETAIL: str = "low"  # "low", "high" or "auto"
+    VISION_AUTO_HIGH_DETAIL_MAX_TOKENS: int = 14167
+    # Image token rates of OPENAI_VISION_MODEL (gpt-4o-mini): per image, plus per
+    # 512px tile at high detail. gpt-4o bills 85 and 170.
+    VISION_IMAGE_BASE_TOKENS: int = 2833
+    VISION_IMAGE_TILE_TOKENS: int = 5667
+    VISION_MAX_EDGE: int = 2048
+    VISION_IMAGE_FORMAT: str = "JPEG"  # "JPEG" or "WEBP"
+    VISION_IMAGE_QUALITY: int = 85
+    IMAGE_WORKERS: int = 4
+
+    # Local image scoring (see app.services.scoring for the registered scorers)
+    LOCAL_SCORERS: str = "color_saturation,leaf_coverage,brown_spots"
+    SCORING_WORKERS: int = 2
+
+    # Local quality gate run before the vision call; failures return 422
+    IMAGE_GATE_ENABLED: bool = True
+    IMAGE_GATE_MIN_EDGE: int = 200
+    IMAGE_GATE_MIN_SHARPNESS: float = 25.0  # Laplacian variance on a 256px thumbnail
+    IMAGE_GATE_MIN_BRIGHTNESS: float = 0.08
+    IMAGE_GATE_MAX_BRIGHTNESS: float = 0.92
+    IMAGE_GATE_MAX_CLIPPED: float = 0.5
+    # Fraction of foliage (excess green) or saturated bloom/fruit pixels
+    IMAGE_GATE_MIN_VEGETATION: float = 0.03
+    IMAGE_GATE_MIN_BLOOM_SATURATION: float = 0.35
+    IMAGE_GATE_MIN_TEXTURE: float = 2.0
+
+    # Idempotent /model/new/: concurrent requests with the same Idempotency-Key (or,
+    # without one, the same upload and fields) share one analysis, and the result
+    # is replayed for IDEMPOTENCY_REPLAY_SECONDS. The lock lives in MongoDB.
+    # Disable IDEMPOTENCY_DERIVE_FROM_CONTENT to key only on the header.
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_DERIVE_FROM_CONTENT: bool = True
+    IDEMPOTENCY_REPLAY_SECONDS: int = 10 * 60
+    # Completed results also kept in process for the replay window
+    IDEMPOTENCY_LOCAL_MAX_ENTRIES: int = 1024
+    # Renewed every third of this while the work runs, so it only needs to outlast
+    # a crashed process's last heartbeat, not the slowest create_model
+    IDEMPOTENCY_LOCK_SECONDS: int = 120
+    IDEMPOTENCY_WAIT_SECONDS: float = 120.0
+    IDEMPOTENCY_POLL_INTERVAL_SECONDS: float = 0.25
+    # Each lock operation gives up after this long; after a failure the lock is
+    # skipped (in-process single-flight only) for IDEMPOTENCY_FAILURE_BACKOFF_SECONDS
+    IDEMPOTENCY_OP_TIMEOUT_SECONDS: float = 1.0
+    IDEMPOTENCY_FAILURE_BACKOFF_SECONDS: float = 30.0
+
+    # Near-duplicate detection (Hamming distance between 64-bit dHashes)
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 6
     
     # MongoDB settings
     MONGODB_URL: str
     MONGODB_DB_NAME: str
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 5
+    MONGODB_MAX_IDLE_TIME_MS: int = 60000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"
+    MONGODB_READ_PREFERENCE: str = "primary"
+    MONGODB_HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+    USERS_STREAM_BATCH_SIZE: int = 1000
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_NEGATIVE_TTL_SECONDS: float = 5.0
+
+    # Buffered Mongo writes
+    BULK_WRITE_MAX_BATCH: int = 500
+    BULK_WRITE_FLUSH_MS: float = 200.0
+    BULK_WRITE_MAX_PENDING: int = 10000
+    # Transient failures are retried with exponential backoff before a batch is
+    # dropped; new writes wait on the full queue in the meantime
+    BULK_WRITE_MAX_ATTEMPTS: int = 5
+    BULK_WRITE_RETRY_BASE_SECONDS: float = 0.5
+    BULK_WRITE_RETRY_MAX_SECONDS: float = 10.0
 
     # NEAR API URL
     NEAR_API_URL: str = "https://hackcanadanear.onrender.com/api/nft"
 
+    # Mint job queue
+    MINT_WORKERS: int = 16
+    MINT_MAX_ATTEMPTS: int = 5
+    MINT_BACKOFF_BASE_SECONDS: float = 1.0
+    MINT_BACKOFF_MAX_SECONDS: float = 60.0
+    MINT_JOB_LEASE_SECONDS: float = 120.0
+    MINT_POLL_INTERVAL_SECONDS: float = 2.0
+
+    # Mint request coalescing
+    MINT_BATCH_ENABLED: bool = True
+    MINT_BATCH_WINDOW_MS: float = 50.0
+    MINT_BATCH_MAX_SIZE: int = 25
+    MINT_BULK_PATH: str = "/mint/bulk"
+
+    # Outbound HTTP connection pools (NEAR mint service and OpenAI)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 60.0
+    HTTP_WRITE_TIMEOUT: float = 10.0
+    HTTP_POOL_TIMEOUT: float = 5.0
+
     class Config:
         env_file = ".env"
         case_sensitive = True
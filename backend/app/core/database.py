@@ -1,40 +1,415 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.errors import (
+    AutoReconnect,
+    BulkWriteError,
+    DuplicateKeyError,
+    ExecutionTimeout,
+    NetworkTimeout,
+    PyMongoError,
+    WTimeoutError,
+)
 from ..core.config import settings
+from .log import get_logger
+from .telemetry import BUFFERED_WRITES_DROPPED, span
+
+logger = get_logger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Whether a failed write may succeed if sent again unchanged
+    """
+    if isinstance(error, (AutoReconnect, NetworkTimeout, ExecutionTimeout, WTimeoutError)):
+        return True
+    return isinstance(error, PyMongoError) and error.has_error_label("RetryableWriteError")
+
+
+# Python packages pymongo needs for each wire compressor (zlib is built in)
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool checkout counters and wait times. pymongo calls these hooks from
+    the driver's worker threads, so state is guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checked_out = 0
+        self.connections = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        # pymongo >= 4.7 reports the duration itself
+        wait = getattr(event, "duration", None)
+        if wait is None:
+            wait = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": 1000 * self.total_wait_seconds / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": 1000 * self.max_wait_seconds,
+            }
+
 
 class Database:
     client: AsyncIOMotorClient = None
     db = None
+    writers: List["BufferedWriter"] = []
+    pool_metrics = PoolMetrics()
+    healthy: Optional[bool] = None
+    last_health_check: Optional[datetime] = None
+    last_health_error: Optional[str] = None
+    _connect_lock: Optional[asyncio.Lock] = None
+    _health_task: Optional[asyncio.Task] = None
 
 async def get_database() -> AsyncIOMotorClient:
     """
     Get database connection
     """
-    print("Getting database:", Database.db)
     if Database.db is None:
-        print("Database connection not initialized!")
         await connect_to_mongo()
     return Database.db
 
+def _compressors() -> List[str]:
+    """
+    Configured compressors whose Python support is installed, in preference order
+    """
+    names = [name.strip() for name in settings.MONGODB_COMPRESSORS.split(",") if name.strip()]
+    return [
+        name for name in names
+        if name in COMPRESSOR_MODULES and importlib.util.find_spec(COMPRESSOR_MODULES[name])
+    ]
+
 async def connect_to_mongo():
     """
-    Connect to MongoDB
+    Connect to MongoDB. Safe to call concurrently: only the first caller builds
+    the client. Creating the client does no I/O; reachability is tracked by the
+    background health check.
+    """
+    if Database.client is not None:
+        return
+
+    # Created lazily so the lock belongs to the running event loop
+    if Database._connect_lock is None:
+        Database._connect_lock = asyncio.Lock()
+
+    async with Database._connect_lock:
+        if Database.client is not None:
+            return
+        try:
+            compressors = _compressors()
+            options = {
+                "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+                "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+                "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+                "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                "readPreference": settings.MONGODB_READ_PREFERENCE,
+                "event_listeners": [Database.pool_metrics],
+            }
+            if compressors:
+                options["compressors"] = ",".join(compressors)
+
+            client = AsyncIOMotorClient(settings.MONGODB_URL, **options)
+            Database.db = client[settings.MONGODB_DB_NAME]
+            Database.client = client
+            logger.info(f"MongoDB client created (compressors={compressors or 'none'})")
+        except Exception as e:
+            logger.error(f"Error connecting to MongoDB: {e}")
+            raise e
+
+async def ping_mongo() -> bool:
+    """
+    Ping the server and record the result
     """
     try:
-        print("Connecting to MongoDB URL:", settings.MONGODB_URL)
-        Database.client = AsyncIOMotorClient(settings.MONGODB_URL)
-        Database.db = Database.client[settings.MONGODB_DB_NAME]
-        print("Connected to MongoDB Atlas!")
-        # Test the connection
+        await get_database()
         await Database.client.admin.command('ping')
-        print("Pinged database successfully!")
+        Database.healthy = True
+        Database.last_health_error = None
     except Exception as e:
-        print(f"Error connecting to MongoDB: {e}")
-        raise e
+        Database.healthy = False
+        Database.last_health_error = str(e)
+    Database.last_health_check = datetime.utcnow()
+    return Database.healthy
+
+async def _health_check_loop():
+    was_healthy = None
+    while True:
+        healthy = await ping_mongo()
+        if healthy != was_healthy:
+            if healthy:
+                logger.info("Pinged database successfully!")
+            else:
+                logger.error(f"MongoDB health check failed: {Database.last_health_error}")
+            was_healthy = healthy
+        await asyncio.sleep(settings.MONGODB_HEALTH_CHECK_INTERVAL_SECONDS)
+
+def start_health_check():
+    """
+    Ping MongoDB periodically in the background instead of blocking startup on it
+    """
+    if Database._health_task is None:
+        Database._health_task = asyncio.create_task(_health_check_loop())
+
+def mongo_status() -> Dict[str, Any]:
+    return {
+        "healthy": Database.healthy,
+        "last_check": Database.last_health_check,
+        "error": Database.last_health_error,
+        "pool": Database.pool_metrics.stats(),
+    }
 
 async def close_mongo_connection():
     """
-    Close MongoDB connection
+    Close MongoDB connection, flushing buffered writes first
     """
+    if Database._health_task is not None:
+        Database._health_task.cancel()
+        await asyncio.gather(Database._health_task, return_exceptions=True)
+        Database._health_task = None
+
+    for writer in Database.writers:
+        await writer.close()
+    Database.writers = []
+
     if Database.client:
         Database.client.close()
-        print("MongoDB connection closed!") 
\ No newline at end of file
+        Database.client = None
+        Database.db = None
+        logger.info("MongoDB connection closed!")
+
+
+class BufferedWriter:
+    """
+    Groups inserts into insert_many batches off the request path.
+
+    write() only enqueues, and a background task flushes once max_batch documents
+    are waiting or flush_interval has passed since the first one. The queue is
+    bounded, so when Mongo falls behind write() waits instead of buffering without
+    limit. Transient failures are retried with exponential backoff while the queue
+    keeps applying that backpressure; documents that still fail are counted in
+    mongo_buffered_writes_dropped_total and their ids logged. With
+    ignore_duplicates, a document whose _id already exists counts as written, for
+    collections keyed by content. Pending documents are flushed by
+    close_mongo_connection.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        max_batch: int,
+        flush_interval: float,
+        max_pending: int,
+        max_attempts: int = 5,
+        retry_base: float = 0.5,
+        retry_max: float = 10.0,
+        ignore_duplicates: bool = False,
+    ):
+        self.collection_name = collection_name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.ignore_duplicates = ignore_duplicates
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.retries = 0
+        self.batches = 0
+
+    def start(self):
+        """
+        Start the background flusher and register for flushing on shutdown
+        """
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run())
+        Database.writers.append(self)
+
+    async def write(self, doc: Dict[str, Any]):
+        if self._queue is None:
+            # Not started, e.g. when used from a script: write straight through
+            db = await get_database()
+            try:
+                await db[self.collection_name].insert_one(doc)
+            except DuplicateKeyError:
+                if not self.ignore_duplicates:
+                    raise
+                self.duplicates += 1
+            return
+        await self._queue.put(doc)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        self.batches += 1
+        pending = batch
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                pending, error = await self._insert(pending, retried=attempt > 1)
+                if not pending:
+                    return
+                if error is None or attempt == self.max_attempts:
+                    break
+                self.retries += 1
+                delay = min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+                logger.warning(
+                    f"Buffered write of {len(pending)} documents to {self.collection_name} failed "
+                    f"(attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s: {error}"
+                )
+                await asyncio.sleep(delay)
+            self._drop(pending, error)
+        except asyncio.CancelledError:
+            self._drop(pending, "writer stopped")
+            raise
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _insert(self, docs: List[Dict[str, Any]], retried: bool):
+        """
+        Insert docs once. Returns the documents that still need writing and, if
+        they may succeed on a retry, the transient error; permanent write errors
+        are dropped here.
+        """
+        try:
+            db = await get_database()
+            with span("mongo.insert_many", collection=self.collection_name, documents=len(docs)):
+                # insert_many sets _id on each document, so a retry cannot insert twice
+                result = await db[self.collection_name].insert_many(docs, ordered=False)
+            self.written += len(result.inserted_ids)
+            return [], None
+        except BulkWriteError as e:
+            self.written += e.details.get("nInserted", 0)
+            failed = []
+            for write_error in e.details.get("writeErrors", []):
+                duplicate = write_error.get("code") == DUPLICATE_KEY
+                if duplicate and retried:
+                    # Inserted by an earlier attempt whose acknowledgement was lost
+                    self.written += 1
+                elif duplicate and self.ignore_duplicates:
+                    self.duplicates += 1
+                else:
+                    failed.append(docs[write_error["index"]])
+            self._drop(failed, f"{len(failed)} write errors")
+            if e.details.get("writeConcernErrors"):
+                logger.error(f"Buffered write to {self.collection_name} had write concern errors: {e.details['writeConcernErrors']}")
+            return [], None
+        except Exception as e:
+            if is_transient(e):
+                return docs, str(e)
+            self._drop(docs, str(e))
+            return [], None
+
+    def _drop(self, docs: List[Dict[str, Any]], reason: str):
+        if not docs:
+            return
+        self.dropped += len(docs)
+        BUFFERED_WRITES_DROPPED.labels(collection=self.collection_name).inc(len(docs))
+        ids = ", ".join(str(doc.get("_id")) for doc in docs)
+        logger.error(f"Dropped {len(docs)} buffered writes to {self.collection_name} ({reason}): {ids}")
+
+    async def close(self, timeout: float = 10.0):
+        """
+        Flush everything still queued and stop the background task
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out flushing {self._queue.qsize()} buffered writes to {self.collection_name}")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        unflushed = []
+        while not self._queue.empty():
+            unflushed.append(self._queue.get_nowait())
+        self._drop(unflushed, "shut down before flushing")
+        self._task = None
+        self._queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "batches": self.batches,
+        }
@@ -0,0 +1,60 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .config import settings
+
+
+class Executors:
+    thread_pool: Optional[ThreadPoolExecutor] = None
+    process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """
+    Shared pool for CPU-bound work that releases the GIL, such as Pillow decoding
+    """
+    if Executors.thread_pool is None:
+        Executors.thread_pool = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix="image-worker",
+        )
+    return Executors.thread_pool
+
+
+async def run_in_thread_pool(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run func in the shared thread pool without blocking the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), partial(func, *args, **kwargs))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Shared pool for CPU-bound Python/NumPy work that would hold the GIL
+    """
+    if Executors.process_pool is None:
+        Executors.process_pool = ProcessPoolExecutor(max_workers=settings.SCORING_WORKERS)
+    return Executors.process_pool
+
+
+async def run_in_process_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a picklable top-level function in the shared process pool
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+async def shutdown_executors():
+    """
+    Shut down the shared pools
+    """
+    if Executors.thread_pool is not None:
+        Executors.thread_pool.shutdown(wait=False, cancel_futures=True)
+        Executors.thread_pool = None
+    if Executors.process_pool is not None:
+        Executors.process_pool.shutdown(wait=False, cancel_futures=True)
+        Executors.process_pool = None
@@ -0,0 +1,102 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from .config import settings
+from .telemetry import current_request_id, trace_logger
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, tagged with the id of the request that logged it.
+    Pass structured data with extra={"fields": {...}}.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Capture the request id on the calling task; the record is formatted later on
+    the listener thread, where the context variable is no longer set
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class _Listeners:
+    active: List[logging.handlers.QueueListener] = []
+
+
+def _queued(logger: logging.Logger, handler: logging.Handler):
+    """
+    Route logger through a queue so callers only pay for an enqueue; the actual
+    formatting and I/O happen on a background listener thread
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    logger.handlers = [queue_handler]
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    _Listeners.active.append(listener)
+
+
+def setup_logging():
+    """
+    Configure non-blocking application logging, plus the trace export file when
+    TRACE_EXPORT_PATH is set. Safe to call more than once.
+    """
+    if _Listeners.active:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(request_id)s %(message)s"))
+
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    _queued(root, handler)
+
+    if settings.TRACE_EXPORT_PATH:
+        trace_handler = logging.FileHandler(settings.TRACE_EXPORT_PATH)
+        trace_handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_logger.setLevel(logging.INFO)
+        trace_logger.propagate = False
+        _queued(trace_logger, trace_handler)
+
+
+def shutdown_logging():
+    """
+    Flush and stop the listener threads
+    """
+    for listener in _Listeners.active:
+        listener.stop()
+    _Listeners.active = []
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    return logging.getLogger(name)
@@ -0,0 +1,126 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+import jwt
+
+from .cache import LRUCache
+from .config import settings
+
+
+class InvalidToken(Exception):
+    """
+    Raised for a missing, malformed, expired or wrongly signed token. Callers
+    should answer 401.
+    """
+
+
+def key_id(secret: str) -> str:
+    """
+    Short fingerprint of a signing key, sent as the token's kid header so
+    verification can pick the right key after a rotation
+    """
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+@lru_cache(maxsize=8)
+def _keys(current: str, previous: str) -> Tuple[Tuple[str, str], ...]:
+    secrets = [current] + [key.strip() for key in previous.split(",") if key.strip()]
+    return tuple((key_id(secret), secret) for secret in secrets)
+
+
+def verification_keys() -> Tuple[Tuple[str, str], ...]:
+    """
+    (kid, secret) pairs, current signing key first
+    """
+    return _keys(settings.SECRET_KEY, settings.PREVIOUS_SECRET_KEYS)
+
+
+def create_access_token(claims: Dict[str, Any]) -> str:
+    """
+    Sign claims with the current key, adding exp when it isn't set
+    """
+    payload = dict(claims)
+    payload.setdefault("exp", datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    kid, secret = verification_keys()[0]
+    return jwt.encode(payload, secret, algorithm=settings.JWT_ALGORITHM, headers={"kid": kid})
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a token's signature and expiry without the claims cache
+    """
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.PyJWTError as e:
+        raise InvalidToken(f"Malformed token: {str(e)}")
+
+    keys = verification_keys()
+    if kid is not None:
+        # Tokens issued before kid headers were added fall through to trying every key
+        keys = [key for key in keys if key[0] == kid] or keys
+
+    error: jwt.PyJWTError = jwt.InvalidSignatureError("No verification key")
+    for _, secret in keys:
+        try:
+            return jwt.decode(
+                token,
+                secret,
+                algorithms=[settings.JWT_ALGORITHM],
+                leeway=settings.JWT_LEEWAY_SECONDS,
+            )
+        except jwt.InvalidSignatureError as e:
+            error = e
+        except jwt.ExpiredSignatureError:
+            raise InvalidToken("Token has expired")
+        except jwt.PyJWTError as e:
+            raise InvalidToken(f"Invalid token: {str(e)}")
+    raise InvalidToken(f"Invalid token: {str(error)}")
+
+
+class ClaimsCache:
+    """
+    Caches verified claims by SHA-256 of the token, so a client sending the same
+    bearer token on every request pays for one HMAC verification rather than one
+    per request. Entries expire with the token's exp (plus leeway) or after
+    ttl_seconds, whichever comes first; the TTL also bounds how long a token
+    signed with a since-removed key keeps working.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        digest = hashlib.sha256(token.encode()).digest()
+        claims = self.cache.get(digest)
+        if claims is not None:
+            return claims
+
+        claims = decode_token(token)
+        ttl = self.ttl_seconds
+        if "exp" in claims:
+            ttl = min(ttl, claims["exp"] + settings.JWT_LEEWAY_SECONDS - time.time())
+        # LRUCache treats a zero TTL as "never expires", so only cache positive ones
+        if ttl > 0:
+            self.cache.set(digest, claims, ttl_seconds=ttl)
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+claims_cache = ClaimsCache(
+    max_entries=settings.JWT_CLAIMS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.JWT_CLAIMS_CACHE_TTL_SECONDS,
+)
+
+
+def verify_token(token: str) -> Dict[str, Any]:
+    """
+    Verified claims for a bearer token, served from the claims cache when possible
+    """
+    # Copy so callers can't mutate the cached claims
+    return dict(claims_cache.verify(token))
@@ -0,0 +1,226 @@
+import logging
+import json
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+from .config import settings
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, measured until the last body byte is sent",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Latency of individual pipeline stages",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+STAGE_ERRORS = Counter(
+    "stage_errors_total",
+    "Pipeline stages that raised",
+    ["stage"],
+)
+
+BUFFERED_WRITES_DROPPED = Counter(
+    "mongo_buffered_writes_dropped_total",
+    "Documents a BufferedWriter gave up on after permanent errors or exhausted retries",
+    ["collection"],
+)
+
+# Finished traces are written here as JSON lines; see export_trace
+trace_logger = logging.getLogger("app.traces")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """
+        Span in the shape of the OTLP/JSON encoding, so a collector's file
+        receiver can ingest the export directly
+        """
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    trace = current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def new_span(name: str, trace_id: str, parent_id: Optional[str] = None, **attributes: Any) -> Span:
+    return Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent_id,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """
+    Time a stage. The duration always feeds the stage_duration_seconds histogram;
+    inside a request it is also recorded as a child span of the request trace.
+    Works in both sync and async code, since entering and leaving never awaits.
+    """
+    trace = current_trace.get()
+    parent = current_span.get()
+    item = new_span(
+        name,
+        trace.trace_id if trace else "",
+        parent.span_id if parent else None,
+        **attributes,
+    )
+    token = current_span.set(item)
+    started = time.perf_counter()
+    try:
+        yield item
+    except BaseException as e:
+        item.error = f"{type(e).__name__}: {e}"
+        STAGE_ERRORS.labels(stage=name).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage=name).observe(time.perf_counter() - started)
+        item.end_ns = time.time_ns()
+        current_span.reset(token)
+        if trace is not None:
+            trace.spans.append(item)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[str]:
+    """
+    Trace id from a W3C traceparent header, so our spans join the caller's trace
+    """
+    if not header:
+        return None
+    parts = header.split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and parts[1] != "0" * 32:
+        return parts[1]
+    return None
+
+
+def route_template(scope) -> str:
+    """
+    Full path template of the route that handled a request, e.g. /v1/assets/{sha256}.
+    A route inside an included router or mount only knows its own relative path, so
+    the prefix is taken from the part of the request path in front of it.
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+
+    path = scope["path"]
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is not None:
+        for i, char in enumerate(path):
+            if char == "/" and path_regex.match(path[i:]):
+                return path[:i] + path_format
+    return scope.get("root_path", "") + path_format
+
+
+def export_trace(trace: Trace):
+    """
+    Hand a finished trace to the trace logger; the write happens on the log
+    listener thread, off the event loop
+    """
+    if not settings.TRACE_EXPORT_PATH or not trace.spans:
+        return
+    trace_logger.info(json.dumps({
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": settings.PROJECT_NAME}},
+            ]},
+            "scopeSpans": [{"spans": [item.to_otlp() for item in trace.spans]}],
+        }]
+    }, default=str))
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware that opens a trace per HTTP request, echoes its id in an
+    X-Request-ID header and records the request latency. Unlike BaseHTTPMiddleware
+    it keeps timing until a streamed response has sent its last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        trace_id = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1")) or secrets.token_hex(16)
+        trace = Trace(trace_id=trace_id)
+        root = new_span("http.request", trace_id, method=scope["method"], path=scope["path"])
+        trace_token = current_trace.set(trace)
+        span_token = current_span.set(root)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", trace_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            route_path = route_template(scope)
+            REQUEST_LATENCY.labels(
+                method=scope["method"], route=route_path, status=str(status)
+            ).observe(time.perf_counter() - started)
+            root.end_ns = time.time_ns()
+            root.attributes.update({"route": route_path, "status": status})
+            trace.spans.append(root)
+            current_span.reset(span_token)
+            current_trace.reset(trace_token)
+            export_trace(trace)
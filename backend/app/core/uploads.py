@@ -0,0 +1,156 @@
+import binascii
+import hashlib
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from .config import settings
+from .telemetry import span
+
+# Multiple of 3 so each chunk base64-encodes without padding
+BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class IngestedUpload:
+    """
+    An upload copied into a spooled temp file that the app owns, so it can outlive
+    the request that received it. Small bodies stay in memory, larger ones go to disk.
+    """
+    file: SpooledTemporaryFile
+    size: int
+    sha256: str
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+
+    def describe(self) -> str:
+        """
+        The upload as named in messages, e.g. "plant.jpg (20480 bytes)"
+        """
+        return f"{self.filename or 'upload'} ({self.size} bytes)"
+
+    def rewind(self) -> SpooledTemporaryFile:
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self.file.close()
+
+
+async def ingest_upload(
+    upload: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    spool_threshold: Optional[int] = None,
+) -> IngestedUpload:
+    """
+    Stream an upload in fixed-size chunks, hashing it and enforcing the size limit as
+    it goes, without ever holding the whole body in memory
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    spool_threshold = spool_threshold or settings.UPLOAD_SPOOL_THRESHOLD
+
+    spool = SpooledTemporaryFile(max_size=spool_threshold)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with span("upload.read") as item:
+            await upload.seek(0)
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                spool.write(chunk)
+            item.attributes["bytes"] = size
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return IngestedUpload(
+        file=spool,
+        size=size,
+        sha256=digest.hexdigest(),
+        filename=upload.filename,
+        content_type=upload.content_type,
+    )
+
+
+class BodySizeLimitMiddleware:
+    """
+    Pure ASGI middleware that caps the request body size. A declared Content-Length
+    over the limit is answered with 413 before the app runs; otherwise the body is
+    counted as it is received, so the multipart parser stops with a 413 as soon as
+    the limit is crossed instead of spooling the whole upload first. limits maps a
+    path prefix to its own cap; the longest matching prefix wins.
+    """
+
+    def __init__(self, app, max_bytes: int, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.limits = sorted((limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def limit_for(self, path: str) -> int:
+        for prefix, max_bytes in self.limits:
+            if path.startswith(prefix):
+                return max_bytes
+        return self.max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.limit_for(scope["path"])
+        detail = f"Request body exceeds the {max_bytes} byte limit"
+        content_length = dict(scope.get("headers") or []).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Re-raised by FastAPI's body parsing and answered by its exception handler
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+
+def encode_data_url(data: bytes, mime_type: str) -> str:
+    """
+    Build a base64 data URL in a single preallocated buffer rather than through
+    intermediate encoded copies
+    """
+    with span("base64.encode", bytes=len(data)):
+        prefix = f"data:{mime_type};base64,".encode("ascii")
+        buffer = bytearray(len(prefix) + 4 * ((len(data) + 2) // 3))
+        buffer[:len(prefix)] = prefix
+
+        view = memoryview(data)
+        position = len(prefix)
+        for start in range(0, len(data), BASE64_CHUNK_SIZE):
+            encoded = binascii.b2a_base64(view[start:start + BASE64_CHUNK_SIZE], newline=False)
+            buffer[position:position + len(encoded)] = encoded
+            position += len(encoded)
+
+        return buffer.decode("ascii")
@@ -8,4 +8,9 @@ class LoginRequest(BaseModel):
 class LoginResponse(BaseModel):
     user_id: str
     username: str
-    access_token: str 
\ No newline at end of file
+    access_token: str
+
+class TokenClaims(BaseModel):
+    user_id: str
+    username: str
+    exp: Optional[int] = None
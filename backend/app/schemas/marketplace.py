@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+class MarketplaceItem(BaseModel):
+    id: str
+    owner_id: str
+    name: str
+    price: float
+    score: float
+    image_url: Optional[str] = None
+    glb_file_url: Optional[str] = None
+    parameters: Dict[str, Any] = {}
+    special: List[Dict[str, Any]] = []
+    created_at: datetime
+
+class MarketplacePage(BaseModel):
+    items: List[MarketplaceItem]
+    next_cursor: Optional[str] = None
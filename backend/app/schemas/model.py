@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Optional, List
 
 class ModelCreate(BaseModel):
     userId: str
@@ -13,7 +13,48 @@ class ModelCreate(BaseModel):
 class ModelResponse(BaseModel):
     success: bool = True
     message: str = "Model created successfully"
+    id: Optional[str] = None
     api1_data: Optional[Dict[str, Any]] = None
     api2_data: Optional[Dict[str, Any]] = None
     gpt_analysis: Optional[str] = None
     combined_score: Optional[float] = None
+
+class ParameterScore(BaseModel):
+    score: int = Field(ge=0, le=100)
+    explanation: str
+
+class PlantParameters(BaseModel):
+    colorVibrancy: ParameterScore
+    leafAreaIndex: ParameterScore
+    wilting: ParameterScore
+    spotting: ParameterScore
+    symmetry: ParameterScore
+
+class SpecialAttribute(BaseModel):
+    attribute: str
+    rarity: int = Field(ge=1, le=5)
+
+class PlantAnalysis(BaseModel):
+    """
+    The analysis JSON the vision model is asked to return
+    """
+    glbFileUrl: str = ""
+    parameters: PlantParameters
+    name: str
+    walletID: str = ""
+    price: int
+    special: List[SpecialAttribute] = []
+
+    def health_score(self) -> float:
+        """
+        Mean of the parameter scores
+        """
+        parameters = self.parameters
+        scores = [
+            parameters.colorVibrancy.score,
+            parameters.leafAreaIndex.score,
+            parameters.wilting.score,
+            parameters.spotting.score,
+            parameters.symmetry.score,
+        ]
+        return sum(scores) / len(scores)
@@ -0,0 +1,76 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+
+from ..core.config import settings
+from ..core.database import BufferedWriter
+from ..core.telemetry import span
+from ..core.uploads import IngestedUpload
+from .marketplace import MarketplaceService
+
+# Analyses are stored as models, so they show up in the marketplace listing
+analysis_writer = BufferedWriter(
+    MarketplaceService.COLLECTION,
+    max_batch=settings.BULK_WRITE_MAX_BATCH,
+    flush_interval=settings.BULK_WRITE_FLUSH_MS / 1000,
+    max_pending=settings.BULK_WRITE_MAX_PENDING,
+    max_attempts=settings.BULK_WRITE_MAX_ATTEMPTS,
+    retry_base=settings.BULK_WRITE_RETRY_BASE_SECONDS,
+    retry_max=settings.BULK_WRITE_RETRY_MAX_SECONDS,
+    ignore_duplicates=True,
+)
+
+
+def model_id_for(userId: str, image_sha256: str) -> ObjectId:
+    """
+    Id of a user's model for an upload, derived from the owner and the content hash
+    so analysing the same bytes again (e.g. a cache hit) maps onto the existing
+    listing instead of inserting another one
+    """
+    return ObjectId(hashlib.sha256(f"{userId}:{image_sha256}".encode()).digest()[:12])
+
+
+def build_model_document(
+    userId: str,
+    imageUrl: str,
+    model_name: str,
+    model_image: Optional[IngestedUpload],
+    analysis: Dict[str, Any],
+    combined_score: float,
+    image_asset_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    The stored form of a successful analysis
+    """
+    parsed = analysis["parsed"]
+    special = parsed.get("special", [])
+    return {
+        "_id": model_id_for(userId, model_image.sha256) if model_image else ObjectId(),
+        "owner_id": userId,
+        "name": model_name or parsed.get("name", ""),
+        "price": parsed.get("price", 0),
+        "score": analysis["confidence"],
+        "combined_score": combined_score,
+        "parameters": parsed["parameters"],
+        "special": special,
+        "max_rarity": max((item["rarity"] for item in special), default=0),
+        "image_url": imageUrl or image_asset_url,
+        "image_asset_url": image_asset_url,
+        "glb_file_url": parsed.get("glbFileUrl") or None,
+        "image_sha256": model_image.sha256 if model_image else None,
+        "prompt_version": analysis.get("prompt_version"),
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def persist_analysis(document: Dict[str, Any]) -> str:
+    """
+    Queue a model document for a batched insert and return its id straight away.
+    A document whose id already exists is left as it is.
+    """
+    # Only the enqueue is on the request path; the insert itself is timed as mongo.insert_many
+    with span("mongo.enqueue_analysis"):
+        await analysis_writer.write(document)
+    return str(document["_id"])
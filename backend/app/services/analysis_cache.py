@@ -0,0 +1,132 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from ..core.cache import LRUCache
+from ..core.config import settings
+from ..core.database import get_database
+from ..core.log import get_logger
+from ..core.telemetry import span
+
+logger = get_logger(__name__)
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache for vision analyses.
+
+    Entries are keyed on a hash of the uploaded bytes plus the prompt version and
+    model name, so any change to either naturally misses. Lookups hit the in-process
+    LRU first and then, when enabled, a MongoDB collection with a TTL index.
+    """
+
+    COLLECTION = "analysis_cache"
+
+    def __init__(self, max_entries: int, ttl_seconds: int, use_mongo: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.use_mongo = use_mongo
+        self.memory = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.mongo_hits = 0
+        self.mongo_errors = 0
+        self._indexes_ready = False
+
+    @staticmethod
+    def content_hash(contents: bytes) -> str:
+        return hashlib.sha256(contents).hexdigest()
+
+    @staticmethod
+    def make_namespace(prompt_version: str, model: str) -> str:
+        return f"{model}:{prompt_version}"
+
+    @staticmethod
+    def make_key(content_hash: str, prompt_version: str, model: str) -> str:
+        return f"{AnalysisCache.make_namespace(prompt_version, model)}:{content_hash}"
+
+    async def collection(self):
+        db = await get_database()
+        collection = db[self.COLLECTION]
+        if not self._indexes_ready:
+            # Mongo removes documents once expires_at has passed
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_ready = True
+        return collection
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached analysis for key, or None on a miss
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        if not self.use_mongo:
+            return None
+
+        try:
+            collection = await self.collection()
+            with span("mongo.analysis_cache.get"):
+                doc = await collection.find_one({"_id": key})
+        except Exception as e:
+            self.mongo_errors += 1
+            logger.error(f"Analysis cache lookup failed: {str(e)}")
+            return None
+
+        # The TTL monitor only runs periodically, so check expiry ourselves too
+        if not doc or doc["expires_at"] <= datetime.utcnow():
+            return None
+
+        self.mongo_hits += 1
+        self.memory.set(key, doc["value"])
+        return doc["value"]
+
+    async def set(self, key: str, value: Dict[str, Any], phash: Optional[int] = None):
+        """
+        Store an analysis in every enabled tier, along with the upload's perceptual
+        hash so the near-duplicate index can be rebuilt from Mongo
+        """
+        self.memory.set(key, value)
+
+        if not self.use_mongo:
+            return
+
+        now = datetime.utcnow()
+        doc = {
+            "_id": key,
+            "value": value,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        if phash is not None:
+            # Stored as hex because 64-bit hashes overflow BSON's signed int64
+            doc["phash"] = format(phash, "016x")
+
+        try:
+            collection = await self.collection()
+            with span("mongo.analysis_cache.set"):
+                await collection.replace_one({"_id": key}, doc, upsert=True)
+        except Exception as e:
+            self.mongo_errors += 1
+            logger.error(f"Analysis cache write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.mongo_hits
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory": memory,
+            "mongo": {
+                "enabled": self.use_mongo,
+                "hits": self.mongo_hits,
+                "errors": self.mongo_errors,
+            },
+        }
+
+
+analysis_cache = AnalysisCache(
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+    use_mongo=settings.ANALYSIS_CACHE_USE_MONGO,
+)
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Any, Optional
+
+from ..core.config import settings
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the formats we store, checked in order
+SIGNATURES = (
+    (b"glTF", "model/gltf-binary"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+
+class AssetNotFound(Exception):
+    pass
+
+
+def sniff_content_type(head: bytes) -> str:
+    """
+    Content type from a file's first 12 bytes
+    """
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+@dataclass
+class BlobInfo:
+    sha256: str
+    size: int
+    content_type: str
+
+
+class BlobStore:
+    """
+    Content-addressed file store. A blob lives at root/ab/cd/<sha256>, named by the
+    SHA-256 of its bytes, so identical uploads are stored once and a blob never
+    changes after it is written. Writes go to a temp file in the same filesystem
+    and are renamed into place, so readers never see a partial blob.
+
+    All methods do blocking file I/O; call them through run_in_thread_pool.
+    """
+
+    def __init__(self, root: str, shard_levels: int = 2, shard_width: int = 2):
+        self.root = Path(root)
+        self.shard_levels = shard_levels
+        self.shard_width = shard_width
+        self.stored = 0
+        self.deduplicated = 0
+
+    def path_for(self, sha256: str) -> Path:
+        if not SHA256_PATTERN.match(sha256):
+            raise AssetNotFound(f"Invalid asset id {sha256!r}")
+        shards = [
+            sha256[i * self.shard_width:(i + 1) * self.shard_width]
+            for i in range(self.shard_levels)
+        ]
+        return self.root.joinpath(*shards, sha256)
+
+    def put(self, source: BinaryIO, sha256: Optional[str] = None) -> BlobInfo:
+        """
+        Store the rest of source and return its info. When the caller already
+        knows the digest and the blob exists, nothing is copied.
+        """
+        if sha256 is not None and self.path_for(sha256).exists():
+            self.deduplicated += 1
+            return self.stat(sha256)
+
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            actual = digest.hexdigest()
+            if sha256 is not None and actual != sha256:
+                raise ValueError(f"Content hash {actual} does not match expected {sha256}")
+
+            path = self.path_for(actual)
+            if path.exists():
+                self.deduplicated += 1
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.chmod(tmp_name, 0o444)
+                # Atomic on POSIX; a concurrent writer of the same blob wrote identical bytes
+                os.replace(tmp_name, path)
+                self.stored += 1
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+        return self.stat(actual)
+
+    def stat(self, sha256: str) -> BlobInfo:
+        path = self.path_for(sha256)
+        try:
+            with open(path, "rb") as blob:
+                head = blob.read(12)
+                size = os.fstat(blob.fileno()).st_size
+        except FileNotFoundError:
+            raise AssetNotFound(f"Asset {sha256} not found")
+        return BlobInfo(sha256=sha256, size=size, content_type=sniff_content_type(head))
+
+    def open(self, sha256: str) -> BinaryIO:
+        try:
+            return open(self.path_for(sha256), "rb")
+        except FileNotFoundError:
+            raise AssetNotFound(f"Asset {sha256} not found")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"root": str(self.root), "stored": self.stored, "deduplicated": self.deduplicated}
+
+
+blob_store = BlobStore(settings.ASSET_STORE_DIR)
+
+
+def asset_url(sha256: str) -> str:
+    return f"{settings.API_V1_STR}/assets/{sha256}"
@@ -1,6 +1,4 @@
-from datetime import datetime, timedelta
-import jwt
-from ..core.config import settings
+from ..core.security import create_access_token
 
 class AuthService:
     @staticmethod
@@ -11,16 +9,11 @@ class AuthService:
         # For testing, create a simple user_id based on username
         user_id = "test_" + username.lower()
         
-        # Create a simple JWT token
-        token = jwt.encode(
-            {
-                "user_id": user_id,
-                "username": username,
-                "exp": datetime.utcnow() + timedelta(days=1)
-            },
-            settings.SECRET_KEY,
-            algorithm="HS256"
-        )
+        # Create a simple JWT token, signed with the current key
+        token = create_access_token({
+            "user_id": user_id,
+            "username": username
+        })
         
         return {
             "user_id": user_id,
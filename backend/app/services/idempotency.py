@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from ..core.cache import LRUCache
+from ..core.config import settings
+from ..core.database import Database, get_database
+from ..core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """
+    The key was already used for a different request. Callers should answer 422.
+    """
+
+
+class IdempotencyInProgress(Exception):
+    """
+    Another process still holds the key after the wait limit. Callers should
+    answer 409 with a Retry-After header.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def request_fingerprint(**fields: Any) -> str:
+    """
+    Stable hash of the request fields, used to spot a key reused for a different request
+    """
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def idempotency_key(user_id: str, header: Optional[str], fingerprint: str, has_upload: bool) -> Optional[str]:
+    """
+    The client's Idempotency-Key scoped to the user, or, for uploads without one,
+    a key derived from the request content so blind retries still coalesce
+    """
+    if header:
+        return f"key:{user_id}:{header}"
+    if has_upload and settings.IDEMPOTENCY_DERIVE_FROM_CONTENT:
+        return f"content:{fingerprint}"
+    return None
+
+
+def is_replayable(result: Dict[str, Any]) -> bool:
+    """
+    Whether a create_model result succeeded and may be stored for replay
+    """
+    api1 = result.get("api1_data") or {}
+    api2 = result.get("api2_data") or {}
+    return (
+        result.get("success") is True
+        and api1.get("api1_result") != "error"
+        and api2.get("api2_result") == "success"
+    )
+
+
+class IdempotencyCoordinator:
+    """
+    Single-flight execution per idempotency key.
+
+    Within a process, concurrent requests for a key attach to one shared task.
+    Across processes, a lease document in MongoDB acts as the lock: the process
+    that inserts it runs the work and renews the lease while it does, others poll
+    until it is completed and then replay the stored result. A lease left behind
+    by a crashed process can be taken over once it expires. Completed results are
+    replayed for the replay window, from an in-process map as well as from
+    MongoDB so replays survive an outage; failures, including results whose analysis
+    failed, release the key so a retry runs again. If MongoDB is unhealthy or a
+    lock operation fails or times out, it degrades to in-process single-flight
+    for a backoff period, so an outage costs one short timeout rather than a
+    server selection timeout on every request.
+    """
+
+    COLLECTION = "idempotency_keys"
+
+    def __init__(self):
+        self.owner = uuid.uuid4().hex
+        self._in_flight: Dict[str, Tuple[asyncio.Task, str]] = {}
+        # Completed results by key, so replays and conflict checks work without MongoDB
+        self._completed = LRUCache(
+            max_entries=settings.IDEMPOTENCY_LOCAL_MAX_ENTRIES,
+            ttl_seconds=settings.IDEMPOTENCY_REPLAY_SECONDS,
+        )
+        self._indexes_ready = False
+        self._unavailable_until = 0.0
+        self.executed = 0
+        self.attached = 0
+        self.replayed = 0
+        self.remote_waits = 0
+        self.lock_errors = 0
+        self.skipped = 0
+
+    async def collection(self):
+        db = await get_database()
+        collection = db[self.COLLECTION]
+        if not self._indexes_ready:
+            # Mongo removes documents once expires_at has passed
+            await self._op(collection.create_index("expires_at", expireAfterSeconds=0))
+            self._indexes_ready = True
+        return collection
+
+    @staticmethod
+    async def _op(operation: Awaitable[Any]) -> Any:
+        """
+        Await one lock operation, bounded by IDEMPOTENCY_OP_TIMEOUT_SECONDS
+        """
+        return await asyncio.wait_for(operation, settings.IDEMPOTENCY_OP_TIMEOUT_SECONDS)
+
+    def available(self) -> bool:
+        """
+        Whether the cross-process lock should be tried at all
+        """
+        if Database.healthy is False:
+            return False
+        return asyncio.get_running_loop().time() >= self._unavailable_until
+
+    def _failed(self, message: str):
+        self.lock_errors += 1
+        now = asyncio.get_running_loop().time()
+        was_available = now >= self._unavailable_until
+        self._unavailable_until = now + settings.IDEMPOTENCY_FAILURE_BACKOFF_SECONDS
+        if was_available:
+            logger.warning(
+                f"{message}; using in-process single-flight only for "
+                f"{settings.IDEMPOTENCY_FAILURE_BACKOFF_SECONDS:.0f}s"
+            )
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        create: Callable[[], Awaitable[Dict[str, Any]]],
+        cleanup: Callable[[], None],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return create()'s result for key and whether it was shared with or replayed
+        from another request. cleanup is called exactly once, when this request's
+        resources are no longer needed: straight away if the work is already in
+        flight or done, otherwise when the shared task finishes, even if the
+        request that started it has gone away.
+        """
+        completed = self._completed.get(key)
+        if completed is not None:
+            cleanup()
+            completed_fingerprint, result = completed
+            if completed_fingerprint != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+            self.replayed += 1
+            return result, True
+
+        entry = self._in_flight.get(key)
+        if entry is not None:
+            cleanup()
+            task, in_flight_fingerprint = entry
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+            self.attached += 1
+            result, _ = await asyncio.shield(task)
+            return result, True
+
+        task = asyncio.create_task(self._execute(key, fingerprint, create, cleanup))
+        self._in_flight[key] = (task, fingerprint)
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key, (None,))[0] is task:
+            del self._in_flight[key]
+        # Retrieve the exception so it isn't reported when every waiter has gone
+        if not task.cancelled():
+            task.exception()
+
+    async def _execute(self, key, fingerprint, create, cleanup) -> Tuple[Dict[str, Any], bool]:
+        try:
+            stored, leased = await self._acquire(key, fingerprint)
+            if stored is not None:
+                self.replayed += 1
+                self._completed.set(key, (fingerprint, stored))
+                return stored, True
+
+            self.executed += 1
+            heartbeat = asyncio.create_task(self._renew(key)) if leased else None
+            try:
+                result = await create()
+            except Exception:
+                if leased:
+                    await self._release(key)
+                raise
+            finally:
+                if heartbeat is not None:
+                    heartbeat.cancel()
+                    await asyncio.gather(heartbeat, return_exceptions=True)
+            if is_replayable(result):
+                self._completed.set(key, (fingerprint, result))
+            if leased:
+                if is_replayable(result):
+                    await self._complete(key, result)
+                else:
+                    # A failed analysis must not be replayed to the retry that follows it
+                    await self._release(key)
+            return result, False
+        finally:
+            cleanup()
+
+    async def _acquire(self, key: str, fingerprint: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Take the cross-process lease for key. Returns the stored result if another
+        process already completed the work, or None once this process may run it,
+        together with whether this process now holds the lease.
+        """
+        if not self.available():
+            self.skipped += 1
+            return None, False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        waiting = False
+        try:
+            collection = await self.collection()
+            while True:
+                now = datetime.utcnow()
+                try:
+                    await self._op(collection.insert_one({
+                        "_id": key,
+                        "fingerprint": fingerprint,
+                        "status": "in_progress",
+                        "owner": self.owner,
+                        "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                        "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                    }))
+                    return None, True
+                except DuplicateKeyError:
+                    pass
+
+                doc = await self._op(collection.find_one({"_id": key}))
+                if doc is None:
+                    # Released or expired since the insert failed
+                    continue
+                if doc["fingerprint"] != fingerprint:
+                    raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+                if doc["status"] == "completed":
+                    if doc["expires_at"] > now:
+                        return doc["response"], False
+                    # The TTL monitor only runs periodically
+                    await self._op(collection.delete_one({"_id": key, "expires_at": doc["expires_at"]}))
+                    continue
+                if doc["locked_until"] <= now:
+                    # The owner crashed or overran its lease
+                    taken = await self._op(collection.find_one_and_update(
+                        {"_id": key, "status": "in_progress", "locked_until": doc["locked_until"]},
+                        {"$set": {
+                            "owner": self.owner,
+                            "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                            "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                        }},
+                    ))
+                    if taken is not None:
+                        logger.warning(f"Took over expired idempotency lease {key}")
+                        return None, True
+                    continue
+
+                if loop.time() >= deadline:
+                    raise IdempotencyInProgress(
+                        "A request with this Idempotency-Key is still in progress",
+                        retry_after=settings.IDEMPOTENCY_POLL_INTERVAL_SECONDS * 4,
+                    )
+                if not waiting:
+                    waiting = True
+                    self.remote_waits += 1
+                await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL_SECONDS)
+        except (PyMongoError, asyncio.TimeoutError) as e:
+            self._failed(f"Idempotency lock unavailable, continuing without it: {str(e) or 'timed out'}")
+            return None, False
+
+    async def _renew(self, key: str):
+        """
+        Extend this process's lease every third of IDEMPOTENCY_LOCK_SECONDS while
+        the work runs, so a slow analysis is never taken over by another process
+        """
+        interval = settings.IDEMPOTENCY_LOCK_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            now = datetime.utcnow()
+            try:
+                collection = await self.collection()
+                renewed = await self._op(collection.update_one(
+                    {"_id": key, "owner": self.owner, "status": "in_progress"},
+                    {"$set": {
+                        "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                        "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                    }},
+                ))
+            except Exception as e:
+                # Keep trying: the lease is still valid for two more intervals
+                self.lock_errors += 1
+                logger.warning(f"Could not renew idempotency lease {key}: {str(e) or 'timed out'}")
+                continue
+            if renewed.matched_count == 0:
+                logger.warning(f"Lost idempotency lease {key}; another process may repeat the work")
+                return
+
+    async def _complete(self, key: str, result: Dict[str, Any]):
+        now = datetime.utcnow()
+        try:
+            collection = await self.collection()
+            await self._op(collection.update_one(
+                {"_id": key, "owner": self.owner},
+                {"$set": {
+                    "status": "completed",
+                    "response": result,
+                    "locked_until": now,
+                    "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_REPLAY_SECONDS),
+                }},
+            ))
+        except Exception as e:
+            self._failed(f"Could not store idempotent result for {key}: {str(e) or 'timed out'}")
+
+    async def _release(self, key: str):
+        try:
+            collection = await self.collection()
+            await self._op(collection.delete_one({"_id": key, "owner": self.owner, "status": "in_progress"}))
+        except Exception as e:
+            self._failed(f"Could not release idempotency lease {key}: {str(e) or 'timed out'}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "completed_local": len(self._completed),
+            "executed": self.executed,
+            "attached": self.attached,
+            "replayed": self.replayed,
+            "remote_waits": self.remote_waits,
+            "lock_errors": self.lock_errors,
+            "lock_skipped": self.skipped,
+            "lock_available": self.available(),
+        }
+
+
+idempotency = IdempotencyCoordinator()
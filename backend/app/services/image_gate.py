@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from PIL import Image
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from ..core.config import settings
+
+# The gate only needs coarse statistics, so it looks at a small thumbnail
+GATE_MAX_EDGE = 256
+# Hue range (degrees) of clear and hazy sky, which is saturated but not a plant
+SKY_HUES = (185.0, 245.0)
+
+
+class ImageRejected(Exception):
+    """
+    Raised when an upload fails the local quality gate. Callers should answer 422.
+    """
+
+    def __init__(self, reasons: List[str], metrics: Dict[str, float]):
+        super().__init__(f"Image rejected: {', '.join(reasons)}")
+        self.reasons = reasons
+        self.metrics = metrics
+
+
+@dataclass
+class GateResult:
+    reasons: List[str] = field(default_factory=list)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        return not self.reasons
+
+
+def laplacian_variance(grey: np.ndarray) -> float:
+    """
+    Variance of the 4-neighbour Laplacian; low values mean few edges, i.e. blur
+    """
+    laplacian = (
+        grey[:-2, 1:-1] + grey[2:, 1:-1] + grey[1:-1, :-2] + grey[1:-1, 2:]
+        - 4 * grey[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def hue_degrees(rgb: np.ndarray, maximum: np.ndarray, chroma: np.ndarray) -> np.ndarray:
+    """
+    HSV hue in degrees, 0-360; undefined (grey) pixels get 0
+    """
+    import numpy as np
+
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    safe = np.where(chroma > 0, chroma, 1.0)
+    hue = np.where(
+        maximum == r, ((g - b) / safe) % 6,
+        np.where(maximum == g, (b - r) / safe + 2, (r - g) / safe + 4),
+    )
+    return np.where(chroma > 0, hue * 60, 0.0)
+
+
+def check_image(data: bytes, original_width: int, original_height: int, thresholds: Dict[str, float]) -> GateResult:
+    """
+    Cheap checks that an upload is worth a vision call: resolution, sharpness,
+    exposure and whether it plausibly shows a plant, counting foliage and
+    saturated flower or fruit colours. Pure NumPy over a
+    thumbnail; call it through run_in_process_pool.
+    """
+    import numpy as np
+
+    result = GateResult()
+    if min(original_width, original_height) < thresholds["min_edge"]:
+        result.reasons.append("resolution_too_low")
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (GATE_MAX_EDGE, GATE_MAX_EDGE))
+        image = image.convert("RGB")
+        image.thumbnail((GATE_MAX_EDGE, GATE_MAX_EDGE))
+        rgb = np.asarray(image, dtype=np.float32)
+
+    # ITU-R BT.601 luma, 0-255
+    grey = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+    sharpness = laplacian_variance(grey)
+    if sharpness < thresholds["min_sharpness"]:
+        result.reasons.append("too_blurry")
+
+    brightness = float(grey.mean()) / 255
+    clipped = float(((grey < 8) | (grey > 247)).mean())
+    if brightness < thresholds["min_brightness"]:
+        result.reasons.append("too_dark")
+    elif brightness > thresholds["max_brightness"]:
+        result.reasons.append("overexposed")
+    elif clipped > thresholds["max_clipped"]:
+        result.reasons.append("poorly_exposed")
+
+    # Excess-green index on chromaticity coordinates picks out foliage under
+    # most lighting
+    total = rgb.sum(axis=2) + 1e-6
+    excess_green = (2 * rgb[..., 1] - rgb[..., 0] - rgb[..., 2]) / total
+    foliage = (excess_green > 0.1) & (grey > 20)
+
+    # Flowers and fruit are often red, purple, orange or yellow with no leaves in
+    # frame: count strongly saturated pixels too, except sky hues and greys
+    maximum = rgb.max(axis=2)
+    chroma = maximum - rgb.min(axis=2)
+    saturation = chroma / (maximum + 1e-6)
+    hue = hue_degrees(rgb, maximum, chroma)
+    sky = (hue >= SKY_HUES[0]) & (hue <= SKY_HUES[1])
+    blooms = (saturation > thresholds["min_saturation"]) & (maximum > 40) & ~sky & ~foliage
+
+    # Requiring some texture rules out flat coloured surfaces
+    vegetation = foliage | blooms
+    coverage = float(vegetation.mean())
+    gradient = np.abs(np.diff(grey, axis=1))[:-1, :] + np.abs(np.diff(grey, axis=0))[:, :-1]
+    inner = vegetation[:-1, :-1]
+    texture = float(gradient[inner].mean()) if inner.any() else 0.0
+    if coverage < thresholds["min_vegetation"] or texture < thresholds["min_texture"]:
+        result.reasons.append("no_plant_detected")
+
+    result.metrics = {
+        "sharpness": round(sharpness, 2),
+        "brightness": round(brightness, 3),
+        "clipped_fraction": round(clipped, 3),
+        "vegetation_fraction": round(coverage, 3),
+        "foliage_fraction": round(float(foliage.mean()), 3),
+        "bloom_fraction": round(float(blooms.mean()), 3),
+        "vegetation_texture": round(texture, 2),
+    }
+    return result
+
+
+def gate_thresholds() -> Dict[str, float]:
+    return {
+        "min_edge": settings.IMAGE_GATE_MIN_EDGE,
+        "min_sharpness": settings.IMAGE_GATE_MIN_SHARPNESS,
+        "min_brightness": settings.IMAGE_GATE_MIN_BRIGHTNESS,
+        "max_brightness": settings.IMAGE_GATE_MAX_BRIGHTNESS,
+        "max_clipped": settings.IMAGE_GATE_MAX_CLIPPED,
+        "min_vegetation": settings.IMAGE_GATE_MIN_VEGETATION,
+        "min_saturation": settings.IMAGE_GATE_MIN_BLOOM_SATURATION,
+        "min_texture": settings.IMAGE_GATE_MIN_TEXTURE,
+    }
+
+
+class GateStats:
+    """
+    Counters for the stats endpoint. Only uploads without a cached analysis are
+    gated, so every rejection is a vision call not made.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.rejected = 0
+        self.reasons: Dict[str, int] = {}
+
+    def record(self, result: GateResult):
+        self.checked += 1
+        if not result.passed:
+            self.rejected += 1
+            for reason in result.reasons:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.IMAGE_GATE_ENABLED,
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "openai_calls_avoided": self.rejected,
+            "rejection_ratio": self.rejected / self.checked if self.checked else 0.0,
+            "reasons": dict(self.reasons),
+        }
+
+
+gate_stats = GateStats()
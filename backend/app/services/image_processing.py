@@ -0,0 +1,124 @@
+import io
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from ..core.config import settings
+from .near_duplicates import dhash
+
+# Low detail requests are billed as one 512x512 tile regardless of input size
+LOW_DETAIL_MAX_EDGE = 512
+# High detail requests are scaled to fit 2048x2048, then to 768px on the shortest side
+HIGH_DETAIL_MAX_EDGE = 2048
+HIGH_DETAIL_MAX_SHORT_EDGE = 768
+
+EXIF_ORIENTATION = 0x0112
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    detail: str
+    width: int
+    height: int
+    original_width: int
+    original_height: int
+    phash: Optional[int] = None
+
+    def tokens(self) -> int:
+        return image_tokens(self.width, self.height, self.detail)
+
+
+def image_tokens(width: int, height: int, detail: str) -> int:
+    """
+    Input tokens the vision model bills for an image of this size: a flat rate at
+    low detail, plus one rate per 512px tile of the rescaled image at high detail
+    """
+    if detail == "low":
+        return settings.VISION_IMAGE_BASE_TOKENS
+    scale = min(1.0, HIGH_DETAIL_MAX_EDGE / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, HIGH_DETAIL_MAX_SHORT_EDGE / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return settings.VISION_IMAGE_BASE_TOKENS + settings.VISION_IMAGE_TILE_TOKENS * tiles
+
+
+def choose_detail(width: int, height: int, policy: Optional[str] = None) -> str:
+    """
+    Pick the vision detail level under policy (VISION_DETAIL by default). "auto"
+    uses low detail when the image is no larger than a single low detail tile, since
+    high detail would add tokens without adding pixels, or when high detail would
+    cost more than VISION_AUTO_HIGH_DETAIL_MAX_TOKENS.
+    """
+    policy = policy or settings.VISION_DETAIL
+    if policy != "auto":
+        return policy
+    if max(width, height) <= LOW_DETAIL_MAX_EDGE:
+        return "low"
+    high_width, high_height = target_size(width, height, "high")
+    if image_tokens(high_width, high_height, "high") > settings.VISION_AUTO_HIGH_DETAIL_MAX_TOKENS:
+        return "low"
+    return "high"
+
+
+def target_size(width: int, height: int, detail: str) -> Tuple[int, int]:
+    """
+    Largest size the vision model will actually look at for the given detail level
+    """
+    if detail == "low":
+        scale = LOW_DETAIL_MAX_EDGE / max(width, height)
+    else:
+        scale = min(
+            HIGH_DETAIL_MAX_EDGE / max(width, height),
+            HIGH_DETAIL_MAX_SHORT_EDGE / min(width, height),
+        )
+    scale = min(scale, settings.VISION_MAX_EDGE / max(width, height), 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def prepare_image(source, compute_phash: bool = True) -> PreparedImage:
+    """
+    Decode an upload, apply its EXIF orientation, downscale it to what the vision
+    model uses and re-encode it compactly. source may be bytes or a binary file object.
+
+    This is CPU-bound; call it through run_in_thread_pool.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    with Image.open(source) as image:
+        raw_width, raw_height = image.size
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8)
+        original_width, original_height = (raw_height, raw_width) if rotated else (raw_width, raw_height)
+
+        detail = choose_detail(original_width, original_height)
+        size = target_size(original_width, original_height, detail)
+
+        # draft() lets the JPEG decoder decode directly at a reduced scale
+        image.draft("RGB", (size[1], size[0]) if rotated else size)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+
+        image_format = settings.VISION_IMAGE_FORMAT.upper()
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, quality=settings.VISION_IMAGE_QUALITY, optimize=True)
+
+        return PreparedImage(
+            data=buffer.getvalue(),
+            mime_type=MIME_TYPES[image_format],
+            detail=detail,
+            width=size[0],
+            height=size[1],
+            original_width=original_width,
+            original_height=original_height,
+            phash=dhash(image) if compute_phash else None,
+        )
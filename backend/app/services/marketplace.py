@@ -0,0 +1,161 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+
+from ..core.database import get_database
+from ..core.telemetry import span
+from ..schemas.model import PlantParameters
+
+SORT_FIELDS = {"price", "score", "created_at"}
+PARAMETER_NAMES = set(PlantParameters.model_fields)
+
+
+class InvalidMarketplaceQuery(ValueError):
+    pass
+
+
+def parse_score_filter(value: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """
+    Parse a "name:min:max" parameter score filter, where either bound may be empty
+    """
+    parts = value.split(":")
+    if len(parts) != 3 or parts[0] not in PARAMETER_NAMES:
+        raise InvalidMarketplaceQuery(
+            f"Score filters look like name:min:max with name one of {sorted(PARAMETER_NAMES)}"
+        )
+    try:
+        low = int(parts[1]) if parts[1] else None
+        high = int(parts[2]) if parts[2] else None
+    except ValueError:
+        raise InvalidMarketplaceQuery(f"Invalid score bounds in {value}")
+    return parts[0], low, high
+
+
+def _range(low: Optional[float], high: Optional[float]) -> Optional[Dict[str, float]]:
+    condition = {}
+    if low is not None:
+        condition["$gte"] = low
+    if high is not None:
+        condition["$lte"] = high
+    return condition or None
+
+
+def encode_cursor(sort_value: Any, object_id: ObjectId) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = {"$date": sort_value.isoformat()}
+    raw = json.dumps([sort_value, str(object_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        sort_value, object_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["$date"])
+        return sort_value, ObjectId(object_id)
+    except (ValueError, TypeError, KeyError, InvalidId):
+        raise InvalidMarketplaceQuery("Invalid cursor")
+
+
+def _serialize_item(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+class MarketplaceService:
+    """
+    Marketplace listings over the models collection. Every page is an index range
+    scan on (sort field, _id), so its cost depends on the page size rather than the
+    size of the catalogue.
+    """
+
+    COLLECTION = "models"
+
+    @staticmethod
+    async def ensure_indexes():
+        """
+        Create the marketplace indexes. Called once at startup.
+        """
+        db = await get_database()
+        collection = db[MarketplaceService.COLLECTION]
+        # One index per sort order; _id breaks ties for keyset pagination
+        for field in SORT_FIELDS:
+            await collection.create_index([(field, ASCENDING), ("_id", ASCENDING)])
+        # Rarity and owner filters
+        await collection.create_index([("max_rarity", ASCENDING), ("score", ASCENDING)])
+        await collection.create_index([("owner_id", ASCENDING), ("created_at", ASCENDING)])
+
+    @staticmethod
+    def build_query(
+        exclude_owner: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rarity: Optional[int] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        score_filters: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if exclude_owner:
+            query["owner_id"] = {"$ne": exclude_owner}
+        price = _range(min_price, max_price)
+        if price:
+            query["price"] = price
+        if min_rarity is not None:
+            # max_rarity is the highest rarity among the model's special attributes
+            query["max_rarity"] = {"$gte": min_rarity}
+        score = _range(min_score, max_score)
+        if score:
+            query["score"] = score
+        for value in score_filters or []:
+            name, low, high = parse_score_filter(value)
+            condition = _range(low, high)
+            if condition:
+                query[f"parameters.{name}.score"] = condition
+        return query
+
+    @staticmethod
+    async def list_models(
+        query: Dict[str, Any],
+        sort_by: str = "created_at",
+        descending: bool = True,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one page of listings matching query and the cursor for the next page
+        """
+        if sort_by not in SORT_FIELDS:
+            raise InvalidMarketplaceQuery(f"sort_by must be one of {sorted(SORT_FIELDS)}")
+
+        direction = -1 if descending else 1
+        if cursor:
+            sort_value, object_id = decode_cursor(cursor)
+            after = "$lt" if descending else "$gt"
+            query = {
+                "$and": [
+                    query,
+                    {"$or": [
+                        {sort_by: {after: sort_value}},
+                        {sort_by: sort_value, "_id": {after: object_id}},
+                    ]},
+                ]
+            }
+
+        db = await get_database()
+        with span("mongo.marketplace.list", sort_by=sort_by, limit=limit):
+            docs = await db[MarketplaceService.COLLECTION].find(query).sort(
+                [(sort_by, direction), ("_id", direction)]
+            ).limit(limit + 1).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1][sort_by], docs[-1]["_id"])
+
+        return [_serialize_item(doc) for doc in docs], next_cursor
@@ -0,0 +1,192 @@
+import asyncio
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..core.clients import get_http_client
+from ..core.config import settings
+from ..core.log import get_logger
+from ..core.telemetry import span
+
+logger = get_logger(__name__)
+
+# Status codes that mean the mint service has no bulk route
+BULK_UNSUPPORTED_STATUSES = {404, 405, 501}
+
+
+class MintItemError(Exception):
+    pass
+
+
+def decimal_string(value: Any) -> str:
+    """
+    A non-negative amount as a plain decimal string. Prices are in yoctoNEAR (10**24
+    per NEAR), past float precision, and JSON floats would go out as e.g. 1e+24.
+    """
+    if isinstance(value, bool):
+        raise ValueError("price must be a number")
+    try:
+        amount = Decimal(value if isinstance(value, (int, str)) else str(value))
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"price must be a decimal number, got {value!r}")
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"price must be a non-negative decimal number, got {value!r}")
+    return format(amount.normalize() if amount == amount.to_integral_value() else amount, "f")
+
+
+def mint_body(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A mint payload ready to send, with the price as a decimal string. Also covers
+    jobs queued before prices were validated.
+    """
+    metadata = payload.get("plant_metadata")
+    if not isinstance(metadata, dict) or "price" not in metadata:
+        return payload
+    return {**payload, "plant_metadata": {**metadata, "price": decimal_string(metadata["price"])}}
+
+
+async def post_mint(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Send a single mint request to the NEAR mint service
+    """
+    with span("near.mint"):
+        response = await get_http_client().post(f"{settings.NEAR_API_URL}/mint", json=mint_body(payload))
+        response.raise_for_status()
+        return response.json()
+
+
+class MintBatcher:
+    """
+    Coalesces concurrent mint requests into bulk calls.
+
+    Requests are collected until the window elapses or the batch is full, then sent
+    as one POST of {"mints": [...]} to the bulk route, which is expected to answer
+    {"results": [...]} in the same order (an item with an "error" key is a failure).
+    If the remote has no bulk route the batch is sent as parallel single calls, and
+    bulk is not attempted again. Each caller awaits only its own result.
+    """
+
+    def __init__(self, window_seconds: float, max_batch_size: int):
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.bulk_supported: Optional[bool] = None
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.bulk_calls = 0
+        self.single_calls = 0
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payload, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+
+        if len(batch) == 1 or self.bulk_supported is False:
+            await self._send_singles(batch)
+            return
+
+        # A malformed payload fails its own caller rather than the whole bulk call
+        sendable = []
+        for payload, future in batch:
+            try:
+                sendable.append((mint_body(payload), future))
+            except ValueError as e:
+                future.set_exception(MintItemError(str(e)))
+        batch = sendable
+        if not batch:
+            return
+
+        try:
+            self.bulk_calls += 1
+            with span("near.mint_bulk", items=len(batch)):
+                response = await get_http_client().post(
+                    f"{settings.NEAR_API_URL}{settings.MINT_BULK_PATH}",
+                    json={"mints": [payload for payload, _ in batch]},
+                )
+            if response.status_code in BULK_UNSUPPORTED_STATUSES:
+                logger.warning("Mint service has no bulk route, falling back to single mints")
+                self.bulk_supported = False
+                await self._send_singles(batch)
+                return
+
+            response.raise_for_status()
+            results = response.json()["results"]
+            if len(results) != len(batch):
+                raise MintItemError(f"Bulk mint returned {len(results)} results for {len(batch)} requests")
+            self.bulk_supported = True
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, dict) and result.get("error"):
+                future.set_exception(MintItemError(str(result["error"])))
+            else:
+                future.set_result(result)
+
+    async def _send_singles(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        self.single_calls += len(batch)
+        results = await asyncio.gather(
+            *(post_mint(payload) for payload, _ in batch),
+            return_exceptions=True,
+        )
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """
+        Send anything still waiting for its window and wait for in-flight batches
+        """
+        self._flush()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.MINT_BATCH_ENABLED,
+            "bulk_supported": self.bulk_supported,
+            "batches": self.batches,
+            "items": self.items,
+            "average_batch_size": self.items / self.batches if self.batches else 0.0,
+            "bulk_calls": self.bulk_calls,
+            "single_calls": self.single_calls,
+        }
+
+
+mint_batcher = MintBatcher(
+    window_seconds=settings.MINT_BATCH_WINDOW_MS / 1000,
+    max_batch_size=settings.MINT_BATCH_MAX_SIZE,
+)
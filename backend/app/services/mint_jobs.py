@@ -0,0 +1,246 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..core.config import settings
+from ..core.database import get_database
+from ..core.log import get_logger
+from ..core.telemetry import span
+from .model import ModelService
+
+logger = get_logger(__name__)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Network failures, rate limits and 5xx responses are worth retrying; other
+    4xx responses mean the request itself is wrong
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return True
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter, so retries from many jobs spread out
+    instead of hitting a recovering mint service at the same moment
+    """
+    ceiling = min(settings.MINT_BACKOFF_MAX_SECONDS, settings.MINT_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": str(job["_id"]),
+        "token_id": job["token_id"],
+        "receiver_id": job["receiver_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "error": job.get("error"),
+        "result": job.get("result"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+class MintJobService:
+    """
+    Durable mint queue stored in MongoDB. Jobs are claimed with a lease, so a job
+    left running by a crashed or restarted worker is picked up again once the
+    lease expires, unless that was already its last allowed attempt. While MongoDB
+    is unreachable the workers back off exponentially.
+    """
+
+    COLLECTION = "mint_jobs"
+
+    _workers: List[asyncio.Task] = []
+    _wakeup: Optional[asyncio.Event] = None
+    _indexes_ready = False
+    _store_failing = False
+
+    @staticmethod
+    async def _collection():
+        db = await get_database()
+        collection = db[MintJobService.COLLECTION]
+        if not MintJobService._indexes_ready:
+            # One job per token_id makes enqueueing idempotent
+            await collection.create_index("token_id", unique=True)
+            await collection.create_index([("status", 1), ("next_attempt_at", 1)])
+            MintJobService._indexes_ready = True
+        return collection
+
+    @staticmethod
+    async def enqueue(token_id: str, receiver_id: str, plant_metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a mint, or return the existing job if this token_id was already queued
+        """
+        collection = await MintJobService._collection()
+        now = datetime.utcnow()
+        job = {
+            "token_id": token_id,
+            "receiver_id": receiver_id,
+            "plant_metadata": plant_metadata,
+            "status": "queued",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "locked_until": None,
+            "error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        try:
+            with span("mongo.mint_jobs.insert"):
+                result = await collection.insert_one(job)
+            job["_id"] = result.inserted_id
+        except DuplicateKeyError:
+            logger.info(f"Mint job for token_id={token_id} already exists")
+            with span("mongo.mint_jobs.get"):
+                return await collection.find_one({"token_id": token_id})
+
+        if MintJobService._wakeup is not None:
+            MintJobService._wakeup.set()
+        return job
+
+    @staticmethod
+    async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            object_id = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return None
+        collection = await MintJobService._collection()
+        with span("mongo.mint_jobs.get"):
+            return await collection.find_one({"_id": object_id})
+
+    @staticmethod
+    async def _claim(collection) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued", "next_attempt_at": {"$lte": now}},
+                    {"status": "running", "locked_until": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "locked_until": now + timedelta(seconds=settings.MINT_JOB_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    async def _run(collection, job: Dict[str, Any]):
+        if job["attempts"] > settings.MINT_MAX_ATTEMPTS:
+            # Reclaimed after its lease expired on the last allowed attempt. That
+            # attempt may have minted, so it is not sent again.
+            await collection.update_one(
+                {"_id": job["_id"]},
+                {"$set": {
+                    "status": "failed",
+                    "error": job.get("error") or "Lease expired on the last allowed attempt",
+                    "locked_until": None,
+                    "updated_at": datetime.utcnow(),
+                }},
+            )
+            logger.error(f"Mint job {job['_id']} failed permanently: lease expired after {settings.MINT_MAX_ATTEMPTS} attempts")
+            return
+
+        try:
+            result = await ModelService.mint_nft(
+                token_id=job["token_id"],
+                receiver_id=job["receiver_id"],
+                plant_metadata=job["plant_metadata"],
+            )
+        except Exception as e:
+            now = datetime.utcnow()
+            retry = is_retryable(e) and job["attempts"] < settings.MINT_MAX_ATTEMPTS
+            update = {"error": str(e), "locked_until": None, "updated_at": now}
+            if retry:
+                delay = backoff_delay(job["attempts"])
+                update.update(status="queued", next_attempt_at=now + timedelta(seconds=delay))
+                logger.warning(f"Mint job {job['_id']} attempt {job['attempts']} failed, retrying in {delay:.1f}s: {str(e)}")
+            else:
+                update["status"] = "failed"
+                logger.error(f"Mint job {job['_id']} failed permanently: {str(e)}")
+            await collection.update_one({"_id": job["_id"]}, {"$set": update})
+            return
+
+        await collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {
+                "status": "succeeded",
+                "result": result,
+                "error": None,
+                "locked_until": None,
+                "updated_at": datetime.utcnow(),
+            }},
+        )
+        logger.info(f"Mint job {job['_id']} succeeded")
+
+    @staticmethod
+    async def _worker(worker_id: int):
+        failures = 0
+        while True:
+            try:
+                collection = await MintJobService._collection()
+                job = await MintJobService._claim(collection)
+                failures = 0
+                if MintJobService._store_failing:
+                    MintJobService._store_failing = False
+                    logger.info("Mint workers reached MongoDB again")
+                if job is not None:
+                    await MintJobService._run(collection, job)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Logged once by whichever worker notices first, not on every poll
+                if not MintJobService._store_failing:
+                    MintJobService._store_failing = True
+                    logger.error(f"Mint worker {worker_id} error, backing off: {str(e)}")
+                failures += 1
+                await asyncio.sleep(backoff_delay(failures))
+                continue
+
+            # Idle: sleep until a new job is enqueued or the poll interval elapses,
+            # which also picks up retries whose backoff has expired
+            try:
+                await asyncio.wait_for(MintJobService._wakeup.wait(), settings.MINT_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            MintJobService._wakeup.clear()
+
+    @staticmethod
+    async def start_workers():
+        """
+        Start the bounded pool of mint workers
+        """
+        MintJobService._wakeup = asyncio.Event()
+        MintJobService._workers = [
+            asyncio.create_task(MintJobService._worker(i)) for i in range(settings.MINT_WORKERS)
+        ]
+
+    @staticmethod
+    async def stop_workers():
+        """
+        Cancel the workers. Jobs they were running are retried after their lease expires.
+        """
+        for task in MintJobService._workers:
+            task.cancel()
+        await asyncio.gather(*MintJobService._workers, return_exceptions=True)
+        MintJobService._workers = []
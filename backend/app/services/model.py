@@ -1,140 +1,218 @@
-import json
-from typing import Dict, Any, Optional
-from fastapi import UploadFile
-import random
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple, Callable, Awaitable
 import asyncio
-from openai import AsyncOpenAI, OpenAI
-import os
-import base64
-from dotenv import load_dotenv
-import httpx
 from app.core.config import settings
+from app.services.analysis_cache import analysis_cache, AnalysisCache
+from app.services.near_duplicates import near_duplicate_index
+from app.services.image_processing import prepare_image
+from app.core.executors import run_in_thread_pool, run_in_process_pool
+from app.services.scoring import score_image
+from app.services.image_gate import check_image, gate_thresholds, gate_stats, ImageRejected
+from app.core.uploads import IngestedUpload, encode_data_url
+from app.core.clients import get_openai_client
+from app.services.mint_batcher import mint_batcher, post_mint
+from app.schemas.model import PlantAnalysis
+from app.services.analyses import build_model_document, persist_analysis
+from app.services.assets import blob_store, asset_url
+from app.services.prompts import PromptVersion, PROMPT_STATS, build_messages, select_prompt
+from app.core.admission import AdmissionController, AdmissionRejected, parse_retry_after
+from app.core.log import get_logger
+from app.core.telemetry import span
+from pydantic import ValidationError
+from PIL import UnidentifiedImageError
+import random
 import time
 
-# Load environment variables
-load_dotenv()
-
-# Configure OpenAI
-client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
-prompt = """
-You are a plant health analysis expert. Your task is to analyze a flower's condition based on an image input and provide your insights in a JSON formatted string that exactly matches the schema below. Do not include any additional commentary or text outside of the JSON string.
-
-The JSON schema is as follows:
-
-{
-  "glbFileUrl": string,
-  "parameters": {
-    "colorVibrancy": {
-      "score": int,
-      "explanation": string
-    },
-    "leafAreaIndex": {
-      "score": int,
-      "explanation": string
-    },
-    "wilting": {
-      "score": int,
-      "explanation": string
-    },
-    "spotting": {
-      "score": int,
-      "explanation": string
-    },
-    "symmetry": {
-      "score": int,
-      "explanation": string
-    }
-  },
-  "name": string,
-  "walletID": string,
-  "price": int,
-  "special": [
-    {
-      "attribute": string,
-      "rarity": int
-    }
-  ]
-}
-
-For each field, follow these guidelines:
-
-1. **glbFileUrl:**  
-     - leave blank
-2. **parameters:**  
-   This object contains detailed analyses of specific health indicators:
-   
-   - **colorVibrancy:**  
-     - Evaluate the intensity, saturation, and uniformity of the flower's colors.
-     - Write a two-sentence explanation discussing the brightness, vividness, and any fading or color inconsistencies.
-     - Assign an integer score where a higher score represents excellent color vibrancy.
-     
-   - **leafAreaIndex:**  
-     - Assess the density and coverage of the leaves relative to the flower.
-     - Write a two-sentence explanation that describes whether the foliage is abundant and how it contributes to the overall health.
-     - Assign an integer score where a higher score indicates an optimal leaf area.
-     
-   - **wilting:**  
-     - Determine if there are any signs of wilting, such as drooping or sagging petals and leaves.
-     - Write a two-sentence explanation detailing whether the tissues are firm and hydrated or showing signs of dehydration and drooping.
-     - Assign an integer score where a higher score indicates minimal or no wilting.
-     
-   - **spotting:**  
-     - Identify any spots, blemishes, or discolorations that may signal disease or pest damage.
-     - Write a two-sentence explanation describing the severity and distribution of any spotting observed.
-     - Assign an integer score where a higher score indicates fewer or negligible spotting issues.
-     
-   - **symmetry:**  
-     - Evaluate the overall symmetry of the flower, including the arrangement of petals, leaves, and stem.
-     - Write a two-sentence explanation discussing whether the structure is balanced and regular or irregular and disorganized.
-     - Assign an integer score where a higher score indicates greater symmetry.
-
-3. **name:**  
-   - Provide a string representing the name of the flower or the product derived from it.
-
-4. **walletID:**  
-   - Provide a string that represents the wallet ID associated with this analysis or transaction.
-
-5. **price:**  
-   - Provide an integer representing the price of the product, analysis, or associated item.
-6. **special:**
-   - Provide an array of objects with the following properties:
-     - **attribute:** string, the attribute of the flower
-     - **rarity:** integer, the rarity of the attribute from 1 to 5
-
-**Examples:**
-Below are three examples of correctly formatted outputs:
-
-### Example 1: Healthy Flower Analysis
-**Image Description:**  
-The image shows a vibrant red rose in full bloom. The petals are evenly arranged and glossy with visible dewdrops, supported by lush green leaves and a strong, upright stem. The softly blurred background emphasizes the flower's vivid color and intricate details.
-
-"
-{"glbFileUrl":"","parameters":{"colorVibrancy":{"score":95,"explanation":"The red hue is rich and vibrant, complemented by subtle shading that enhances depth and freshness."},"leafAreaIndex":{"score":85,"explanation":"The foliage is dense, contributing to strong photosynthetic capability and a balanced aesthetic."},"wilting":{"score":97,"explanation":"No signs of wilting; petals and leaves appear fresh and well-hydrated."},"spotting":{"score":100,"explanation":"No visible blemishes or spots, indicating excellent health and optimal environmental conditions."},"symmetry":{"score":96,"explanation":"The petals and leaves are arranged in a near-perfect symmetrical pattern, reflecting strong genetic traits."}},"name":"Radiant Scarlet Rose","walletID":"0xDEF123ABC456XYZ789","price":250,"special":[{"attribute":"Rare Fragrance","rarity":5},{"attribute":"High Petal Count","rarity":4}]}
-"
-
-### Example 2: Moderately Healthy Flower Analysis
-**Image Description:**  
-A sunflower with bright yellow petals, slightly curled at the edges. The center is well-defined, but a few leaves show minor signs of damage. The background features a bright blue sky.
-
-"
-{"glbFileUrl":"","parameters":{"colorVibrancy":{"score":80,"explanation":"The yellow petals are vivid, though slight fading is visible at the tips."},"leafAreaIndex":{"score":70,"explanation":"Leaf coverage is sufficient but not dense; some minor gaps are present."},"wilting":{"score":85,"explanation":"Most petals are firm, but the edges of a few show curling."},"spotting":{"score":65,"explanation":"A few minor brown spots on the lower leaves indicate slight environmental stress."},"symmetry":{"score":78,"explanation":"The overall form is well-balanced, but a few petals are slightly uneven."}},"name":"Golden Helios Sunflower","walletID":"0x987XYZ654DEF321ABC","price":120,"special":[{"attribute":"High Sun Resistance","rarity":3},{"attribute":"Large Seed Head","rarity":2}]}
-"
-
-### Example 3: Unhealthy Flower Analysis
-**Image Description:**  
-A pale, wilted flower with drooping petals and a visibly weakened stem. The background is dull and low-contrast, emphasizing signs of decay such as brown patches and uneven discoloration.
-
-"
-{"glbFileUrl":"","parameters":{"colorVibrancy":{"score":30,"explanation":"The color is faded, with noticeable discoloration and brown patches on the petals."},"leafAreaIndex":{"score":40,"explanation":"The leaf coverage is sparse, with significant gaps due to withering."},"wilting":{"score":20,"explanation":"Petals and leaves appear shriveled and drooping, indicating severe dehydration."},"spotting":{"score":25,"explanation":"Dark spots and necrotic patches indicate signs of disease or pest infestation."},"symmetry":{"score":35,"explanation":"The petals and leaves are asymmetrically arranged, suggesting poor growth conditions."}},"name":"Faded Elegance Lily","walletID":"0x654XYZ987DEF321ABC","price":30,"special":[{"attribute":"Unusual Petal Curling","rarity":2}]}
-"
-Return only the final JSON string as your output.
-
-"""
-
-import aiohttp
-import json
-from typing import Dict, Any
+logger = get_logger(__name__)
+
+
+class AnalysisParseError(Exception):
+    pass
+
+
+# Admission control in front of every vision call, sized to the account's quotas
+vision_admission = AdmissionController(
+    requests_per_minute=settings.OPENAI_RPM_LIMIT,
+    tokens_per_minute=settings.OPENAI_TPM_LIMIT,
+    max_concurrency=settings.VISION_MAX_CONCURRENCY,
+    min_concurrency=settings.VISION_MIN_CONCURRENCY,
+    max_queue=settings.VISION_QUEUE_SIZE,
+    max_wait_seconds=settings.VISION_QUEUE_MAX_WAIT_SECONDS
+)
+
+
+def estimate_tokens(prompt: PromptVersion, image_tokens: int) -> float:
+    """
+    Tokens a request will count against the TPM quota: input plus max_tokens.
+    The image's billed tokens are added to the prompt's text tokens, using the
+    observed average text input for the prompt version once there is one.
+    """
+    stats = PROMPT_STATS[prompt.version]
+    if stats.requests:
+        text_tokens = (stats.prompt_tokens - stats.image_tokens) / stats.requests
+    else:
+        text_tokens = (len(prompt.system) + len(prompt.user_text)) / 4
+    return text_tokens + image_tokens + settings.VISION_MAX_TOKENS
+
+
+ProgressCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+async def stream_completion(messages: List[Dict[str, Any]], on_token: Callable[[str], Awaitable[None]]):
+    """
+    Streamed equivalent of chat.completions.create: forwards each content delta to
+    on_token and returns (content, finish_reason, usage) once the stream ends
+    """
+    stream = await get_openai_client().chat.completions.create(
+        model=settings.OPENAI_VISION_MODEL,
+        messages=messages,
+        response_format={"type": "json_object"},
+        max_tokens=settings.VISION_MAX_TOKENS,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    parts = []
+    finish_reason = None
+    usage = None
+    async for chunk in stream:
+        # The final chunk carries usage and no choices
+        if chunk.usage:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.delta.content:
+            parts.append(choice.delta.content)
+            await on_token(choice.delta.content)
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+    return "".join(parts), finish_reason, usage
+
+
+async def request_analysis(
+    prompt: PromptVersion,
+    image_url: str,
+    detail: str,
+    image_tokens: int,
+    on_token: Optional[Callable[[int, str], Awaitable[None]]] = None
+) -> Tuple[str, PlantAnalysis, Dict[str, int]]:
+    """
+    Ask the vision model for the analysis in JSON mode and validate it once into
+    PlantAnalysis. Truncated or invalid output is retried up to VISION_PARSE_ATTEMPTS
+    times. 429s, 5xx and connection errors are retried up to VISION_API_ATTEMPTS times
+    after giving the admission slot back and backing off; other API errors propagate.
+    Token usage and latency are recorded against the prompt version, and
+    image_tokens (what the image is billed) feeds the admission estimate. When on_token
+    is given the completion is streamed and each (call, delta) is passed to it, where
+    call numbers every request sent, retries included.
+    """
+    # openai is slow to import, so it is only loaded once an analysis is requested
+    from openai import APIConnectionError, APIStatusError
+
+    messages = build_messages(prompt, image_url, detail)
+    last_error = None
+    call = 0
+    parse_attempt = 0
+    api_failures = 0
+    while parse_attempt < settings.VISION_PARSE_ATTEMPTS:
+        call += 1
+        retry_delay = None
+        async with vision_admission.admit(estimate_tokens(prompt, image_tokens)) as ticket:
+            started = time.perf_counter()
+            try:
+                with span("openai.call", model=settings.OPENAI_VISION_MODEL, attempt=call, streamed=on_token is not None):
+                    if on_token is None:
+                        response = await get_openai_client().chat.completions.create(
+                            model=settings.OPENAI_VISION_MODEL,  # Use a model with vision capabilities
+                            messages=messages,
+                            response_format={"type": "json_object"},
+                            max_tokens=settings.VISION_MAX_TOKENS
+                        )
+                        choice = response.choices[0]
+                        content = choice.message.content or ""
+                        finish_reason = choice.finish_reason
+                        response_usage = response.usage
+                    else:
+                        current = call
+                        content, finish_reason, response_usage = await stream_completion(
+                            messages,
+                            lambda delta: on_token(current, delta)
+                        )
+            except (APIStatusError, APIConnectionError) as e:
+                retry_after = None
+                if isinstance(e, APIStatusError):
+                    if e.status_code != 429 and e.status_code < 500:
+                        raise
+                    retry_after = parse_retry_after(e.response.headers)
+                    vision_admission.on_overload(retry_after, admitted_at=ticket.admitted_at)
+                api_failures += 1
+                if api_failures >= settings.VISION_API_ATTEMPTS:
+                    raise
+                backoff = min(
+                    settings.VISION_RETRY_MAX_SECONDS,
+                    settings.VISION_RETRY_BASE_SECONDS * 2 ** (api_failures - 1)
+                )
+                retry_delay = retry_after or random.uniform(backoff / 2, backoff)
+                logger.warning(f"Vision call {call} failed, retrying in {retry_delay:.2f}s: {str(e)}")
+            else:
+                vision_admission.on_success()
+
+                usage = {}
+                if response_usage:
+                    details = getattr(response_usage, "prompt_tokens_details", None)
+                    usage = {
+                        "prompt_tokens": response_usage.prompt_tokens,
+                        "cached_prompt_tokens": getattr(details, "cached_tokens", 0) or 0,
+                        "completion_tokens": response_usage.completion_tokens
+                    }
+                    ticket.settle(response_usage.prompt_tokens + response_usage.completion_tokens)
+                PROMPT_STATS[prompt.version].record(usage, time.perf_counter() - started, image_tokens)
+
+        if retry_delay is not None:
+            # Outside the admission block, so the slot is free while we wait
+            await asyncio.sleep(retry_delay)
+            continue
+
+        parse_attempt += 1
+        if finish_reason == "length":
+            last_error = AnalysisParseError(
+                f"Analysis was truncated at max_tokens={settings.VISION_MAX_TOKENS}"
+            )
+        else:
+            try:
+                with span("analysis.parse"):
+                    parsed = PlantAnalysis.model_validate_json(content)
+                return content, parsed, usage
+            except ValidationError as e:
+                last_error = AnalysisParseError(f"Analysis did not match the schema: {str(e)}")
+
+        logger.warning(f"Analysis attempt {parse_attempt} unusable: {str(last_error)}")
+
+    raise last_error
+
+
+async def lookup_cached_analysis(
+    cache_key: str,
+    namespace: str,
+    image_hash: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    """
+    A stored analysis for the exact upload, or failing that for a near duplicate.
+    Lookup errors count as a miss.
+    """
+    try:
+        cached = await analysis_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Analysis cache hit")
+            return cached
+        if image_hash is not None:
+            cached = await near_duplicate_index.find(namespace, image_hash)
+            if cached is not None:
+                logger.info("Near-duplicate analysis cache hit")
+                return cached
+    except Exception as e:
+        logger.warning(f"Analysis cache lookup failed: {str(e)}")
+    return None
+
 
 class ModelService:
     
@@ -145,32 +223,15 @@ class ModelService:
         """
         Mint an NFT on the NEAR blockchain using the plant metadata
         """
-
-
-        url = "https://hackcanadanear.onrender.com/api/nft/mint"
-
         payload = {
-            "token_id": "1543675436543654375",
-            "receiver_id": "your-account.testnet",
-            "plant_metadata": {
-                "glb_file_url": "https://example.com/plant.glb",
-                "parameters": {
-                    "color_vibrancy": { "score": 85, "explanation": "Vibrant color" },
-                    "leaf_area_index": { "score": 90, "explanation": "High coverage" },
-                    "wilting": { "score": 5, "explanation": "No wilting" },
-                    "spotting": { "score": 2, "explanation": "Minor spots" },
-                    "symmetry": { "score": 92, "explanation": "Well balanced" }
-                },
-                "name": "Test Plant NFT",
-                "wallet_id": "your-account.testnet",
-                "price": "1000000000000000000000000"
-            }
+            "token_id": token_id,
+            "receiver_id": receiver_id,
+            "plant_metadata": plant_metadata
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload)
-
-        return response.json()
+        if settings.MINT_BATCH_ENABLED:
+            return await mint_batcher.submit(payload)
+        return await post_mint(payload)
 
 
     @staticmethod
@@ -180,110 +241,268 @@ class ModelService:
         model_name: str = '',
         model_description: str = '',
         model_image_url: str = '',
-        model_image_file: Optional[UploadFile] = None,
-        model_attributes: Dict[str, Any] = {}
+        model_image: Optional[IngestedUpload] = None,
+        model_attributes: Dict[str, Any] = {},
+        progress: Optional[ProgressCallback] = None
     ):
+        """
+        Analyse an upload: preprocess, look up a cached analysis, gate uncached
+        uploads, then run local scoring and the vision call concurrently. progress, if given, is awaited with (event, data) as each
+        stage completes, including every streamed LLM token.
+        """
+        async def emit(event: str, data: Dict[str, Any]):
+            if progress is not None:
+                await progress(event, data)
+
         try:
-            print(f"Received model data: userId={userId}, imageUrl={imageUrl}")
+            logger.info(f"Received model data: userId={userId}, imageUrl={imageUrl}")
 
-            async def api_call_1():
-                await asyncio.sleep(1)
-                return {
-                    "api1_result": "success",
-                    "score": random.randint(0, 100)
-                }
+            prepared = None
+            preprocess_error = "No image file provided"
+            if model_image:
+                logger.info(f"Image file size: {model_image.size} bytes")
+                try:
+                    # Decode, orient, downscale and re-encode off the event loop
+                    with span("image.preprocess"):
+                        prepared = await run_in_thread_pool(
+                            prepare_image,
+                            model_image.rewind(),
+                            compute_phash=settings.NEAR_DUPLICATE_ENABLED
+                        )
+                    logger.info(
+                        f"Prepared image {prepared.original_width}x{prepared.original_height} -> "
+                        f"{prepared.width}x{prepared.height} ({len(prepared.data)} bytes, detail={prepared.detail})"
+                    )
+                    await emit("preprocessed", {
+                        "original_width": prepared.original_width,
+                        "original_height": prepared.original_height,
+                        "width": prepared.width,
+                        "height": prepared.height,
+                        "detail": prepared.detail
+                    })
+                except Exception as e:
+                    # PIL's messages name the file object, which here is only a temp file repr
+                    reason = "not a supported image format" if isinstance(e, UnidentifiedImageError) else str(e)
+                    logger.error(f"Error preparing image {model_image.describe()}: {reason}")
+                    preprocess_error = f"Could not read image {model_image.describe()}: {reason}"
+
+            prompt = None
+            cache_key = None
+            image_hash = None
+            namespace = None
+            cached = None
+            if prepared is not None:
+                prompt = select_prompt(model_image.sha256)
+                namespace = AnalysisCache.make_namespace(prompt.version, settings.OPENAI_VISION_MODEL)
+                if settings.ANALYSIS_CACHE_ENABLED:
+                    cache_key = AnalysisCache.make_key(
+                        model_image.sha256,
+                        prompt.version,
+                        settings.OPENAI_VISION_MODEL
+                    )
+                    # Re-encoded or re-photographed uploads miss the exact-byte cache
+                    image_hash = prepared.phash
+                    cached = await lookup_cached_analysis(cache_key, namespace, image_hash)
+
+            if prepared is not None and settings.IMAGE_GATE_ENABLED and cached is None:
+                # Blurry, dark, tiny or non-plant uploads never reach the vision model.
+                # Cached analyses skip the gate, so every rejection is a call avoided.
+                with span("image.gate"):
+                    gate = await run_in_process_pool(
+                        check_image,
+                        prepared.data,
+                        prepared.original_width,
+                        prepared.original_height,
+                        gate_thresholds()
+                    )
+                gate_stats.record(gate)
+                if not gate.passed:
+                    logger.warning(f"Image rejected by quality gate: {gate.reasons} {gate.metrics}")
+                    raise ImageRejected(gate.reasons, gate.metrics)
+                await emit("gate_passed", {"metrics": gate.metrics})
+
+            async def local_score():
+                if prepared is None:
+                    return {
+                        "api1_result": "error",
+                        "message": preprocess_error,
+                        "score": 0
+                    }
+                try:
+                    scorers = [name.strip() for name in settings.LOCAL_SCORERS.split(",") if name.strip()]
+                    with span("score.local"):
+                        result = await run_in_process_pool(score_image, prepared.data, scorers)
+                    return {"api1_result": "success", **result}
+                except Exception as e:
+                    logger.error(f"Error in local scoring: {str(e)}")
+                    return {
+                        "api1_result": "error",
+                        "message": str(e),
+                        "score": 0
+                    }
 
             async def chat_gpt_analysis():
                 try:
-                    if not model_image_file:
+                    if prepared is None:
                         return {
                             "api2_result": "error",
-                            "analysis": "No image file provided",
+                            "analysis": preprocess_error,
                             "confidence": 0
                         }
 
-                    # Read image file
-                    contents = await model_image_file.read()
-                    base64_image = base64.b64encode(contents).decode('utf-8')
-                    await model_image_file.seek(0)
+                    if cached is not None:
+                        return {**cached, "cached": True}
 
-                    print("Sending request to OpenAI API...")
+                    logger.info("Sending request to OpenAI API...")
 
                     # Use the vision model and include the base64 image string in the request
-                    response = await client.chat.completions.create(
-                        model="gpt-4o-mini",  # Use a model with vision capabilities
-                        messages=[
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "text",
-                                        "text": prompt
-                                    },
-                                    {
-                                        "type": "image_url",
-                                        "image_url": {
-                                            "url": f"data:image/jpeg;base64,{base64_image}"
-                                        }
-                                    }
-                                ]
-                            }
-                        ],
-                        max_tokens=300
+                    on_token = None
+                    if progress is not None:
+                        async def on_token(attempt: int, delta: str):
+                            await emit("token", {"attempt": attempt, "delta": delta})
+
+                    analysis, parsed, usage = await request_analysis(
+                        prompt,
+                        encode_data_url(prepared.data, prepared.mime_type),
+                        prepared.detail,
+                        prepared.tokens(),
+                        on_token=on_token
                     )
 
-                    print("Received response from OpenAI API")
+                    logger.info("Received response from OpenAI API")
 
-                    analysis = response.choices[0].message.content
-
-                    try:
-                        import re
-                        scores = re.findall(r'(\d{1,3})/100|score.*?(\d{1,3})|health.*?(\d{1,3})', analysis.lower())
-                        confidence = int(scores[0][0]) if scores else random.randint(70, 90)
-                    except:
-                        confidence = random.randint(70, 90)
-
-                    return {
+                    result = {
                         "api2_result": "success",
                         "analysis": analysis,
-                        "confidence": confidence
+                        "parsed": parsed.model_dump(),
+                        "confidence": parsed.health_score(),
+                        "prompt_version": prompt.version,
+                        "usage": usage
                     }
+
+                    if cache_key:
+                        await analysis_cache.set(cache_key, result, phash=image_hash)
+                        if image_hash is not None:
+                            near_duplicate_index.add(namespace, image_hash, cache_key)
+
+                    return result
+                except AdmissionRejected:
+                    # Surfaced to the client as a 503 rather than a failed analysis
+                    raise
                 except Exception as e:
-                    print(f"Error in ChatGPT API call: {str(e)}")
+                    logger.error(f"Error in ChatGPT API call: {str(e)}")
                     return {
                         "api2_result": "error",
                         "analysis": f"Failed to analyze image: {str(e)}",
                         "confidence": 0
                     }
 
+            async def reported(event: str, stage):
+                result = await stage
+                await emit(event, result)
+                return result
+
             api1_result, api2_result = await asyncio.gather(
-                api_call_1(),
-                chat_gpt_analysis()
+                reported("local_score", local_score()),
+                reported("analysis", chat_gpt_analysis())
             )
 
-            print("API 1 Result:", api1_result)
-            print("API 2 Result (ChatGPT):", api2_result)
-
-            if model_image_file:
-                contents = await model_image_file.read()
-                print(f"Image file size: {len(contents)} bytes")
-                await model_image_file.seek(0)
+            combined_score = (api1_result["score"] + api2_result["confidence"]) / 2
+
+            logger.info("Analysis finished", extra={"fields": {
+                "local_score": api1_result["score"],
+                "llm_result": api2_result.get("api2_result"),
+                "llm_confidence": api2_result["confidence"],
+                "cached": api2_result.get("cached", False),
+                "combined_score": combined_score
+            }})
+            logger.debug("API 1 Result: %s", api1_result)
+            logger.debug("API 2 Result (ChatGPT): %s", api2_result)
+
+            model_id = None
+            if api2_result.get("api2_result") == "success" and api2_result.get("parsed"):
+                image_asset_url = None
+                if model_image and settings.ASSET_STORE_UPLOADS:
+                    try:
+                        # Deduplicated by content hash, so re-uploads cost nothing
+                        stored = await run_in_thread_pool(blob_store.put, model_image.rewind(), model_image.sha256)
+                        image_asset_url = asset_url(stored.sha256)
+                    except Exception as e:
+                        logger.warning(f"Could not store upload in the asset store: {str(e)}")
+
+                model_id = await persist_analysis(build_model_document(
+                    userId=userId,
+                    imageUrl=imageUrl,
+                    model_name=model_name,
+                    model_image=model_image,
+                    analysis=api2_result,
+                    combined_score=combined_score,
+                    image_asset_url=image_asset_url
+                ))
 
             combined_result = {
                 "success": True,
                 "message": "Model created successfully",
+                "model_id": model_id,
                 "api1_data": api1_result,
                 "api2_data": api2_result,
-                "combined_score": (api1_result["score"] + api2_result["confidence"]) / 2,
+                "combined_score": combined_score,
                 "gpt_analysis": api2_result.get("analysis", "No analysis available")
             }
 
             return combined_result
             
         except Exception as e:
-            print(f"Error in create_model: {str(e)}")
+            logger.error(f"Error in create_model: {str(e)}")
             raise e
 
+    @staticmethod
+    async def create_models_batch(
+        userId: str,
+        imageUrl: str,
+        model_images: List[IngestedUpload],
+        concurrency: int,
+        model_attributes: Dict[str, Any] = {}
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run create_model for every image with at most `concurrency` in flight,
+        yielding each result as soon as it finishes. A failed image yields an
+        error item instead of aborting the rest of the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index: int, model_image: IngestedUpload):
+            async with semaphore:
+                item = {"index": index, "filename": model_image.filename}
+                try:
+                    result = await ModelService.create_model(
+                        userId=userId,
+                        imageUrl=imageUrl,
+                        model_image=model_image,
+                        model_attributes=model_attributes
+                    )
+                except ImageRejected as e:
+                    return {**item, "success": False, "message": str(e), "reasons": e.reasons}
+                except Exception as e:
+                    return {**item, "success": False, "message": str(e)}
+
+                analysed = result["api2_data"].get("api2_result") == "success"
+                return {
+                    **item,
+                    **result,
+                    "success": result["success"] and analysed,
+                    "message": result["message"] if analysed else result["api2_data"].get("analysis")
+                }
+
+        tasks = [asyncio.create_task(run(index, image)) for index, image in enumerate(model_images)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The client disconnected or the stream was closed early
+            for task in tasks:
+                task.cancel()
+
 def encode_image(image_path: str) -> str:
     """
     Reads a local image file and returns a Base64-encoded string.
@@ -301,9 +520,9 @@ async def analyze_local_image(image_path: str):
     base64_image = encode_image(image_path)
 
     try:
-        print("Sending request to OpenAI for image analysis...")
+        logger.info("Sending request to OpenAI for image analysis...")
 
-        response = await client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model="gpt-4o-mini",  # Ensure you have access to a vision-capable model
             messages=[
                 {
@@ -328,13 +547,13 @@ async def analyze_local_image(image_path: str):
             max_tokens=300,
         )
 
-        print("Received response from OpenAI API")
+        logger.info("Received response from OpenAI API")
         analysis = response.choices[0].message.content
-        print("Analysis:", analysis)
+        logger.info("Analysis: %s", analysis)
         return analysis
 
     except Exception as e:
-        print(f"Error in ChatGPT API call: {str(e)}")
+        logger.error(f"Error in ChatGPT API call: {str(e)}")
         return f"Failed to analyze image: {str(e)}"
     
 
@@ -0,0 +1,207 @@
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from PIL import Image, ImageOps
+
+from ..core.config import settings
+from ..core.log import get_logger
+from .analysis_cache import analysis_cache
+
+logger = get_logger(__name__)
+
+HASH_BITS = 64
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image: one bit per horizontally adjacent pixel pair of a
+    (hash_size + 1) x hash_size greyscale thumbnail. Robust to re-encoding and rescaling.
+    """
+    image = ImageOps.exif_transpose(image)
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class HammingIndex:
+    """
+    Multi-index hash table for Hamming-radius search over fixed-width hashes.
+
+    Each hash is split into max_distance + 1 disjoint segments. By the pigeonhole
+    principle any hash within max_distance of a query matches it exactly on at least
+    one segment, so a search only inspects the few entries sharing a segment value
+    instead of scanning the whole index.
+    """
+
+    def __init__(self, max_distance: int, bits: int = HASH_BITS):
+        self.max_distance = max_distance
+        segments = max_distance + 1
+        width, extra = divmod(bits, segments)
+        self._segments: List[Tuple[int, int]] = []
+        shift = 0
+        for i in range(segments):
+            size = width + (1 if i < extra else 0)
+            self._segments.append((shift, (1 << size) - 1))
+            shift += size
+        self._tables: List[Dict[int, Set[int]]] = [defaultdict(set) for _ in self._segments]
+        self._values: Dict[int, Any] = {}
+
+    def add(self, value_hash: int, value: Any):
+        self._values[value_hash] = value
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            table[(value_hash >> shift) & mask].add(value_hash)
+
+    def remove(self, value_hash: int):
+        if self._values.pop(value_hash, None) is None:
+            return
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            bucket = table.get((value_hash >> shift) & mask)
+            if bucket:
+                bucket.discard(value_hash)
+
+    def search(self, query: int, max_distance: Optional[int] = None) -> List[Tuple[int, int, Any]]:
+        """
+        Return (distance, hash, value) for every entry within max_distance, nearest first
+        """
+        radius = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates: Set[int] = set()
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            bucket = table.get((query >> shift) & mask)
+            if bucket:
+                candidates.update(bucket)
+
+        matches = []
+        for candidate in candidates:
+            distance = hamming(query, candidate)
+            if distance <= radius:
+                matches.append((distance, candidate, self._values[candidate]))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class NearDuplicateIndex:
+    """
+    Maps perceptual hashes of previously analysed uploads to their analysis cache keys,
+    partitioned by cache namespace so a prompt or model change never reuses old results.
+
+    The index is bounded like the analysis cache it points into: at most max_entries
+    hashes, least recently matched evicted first, each dropped after ttl_seconds.
+    """
+
+    def __init__(self, max_distance: int, max_entries: int = 2048, ttl_seconds: Optional[float] = None):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._indexes: Dict[str, HammingIndex] = {}
+        # (namespace, hash) -> monotonic expiry, in least recently used order
+        self._entries: "OrderedDict[Tuple[str, int], Optional[float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _index(self, namespace: str) -> HammingIndex:
+        index = self._indexes.get(namespace)
+        if index is None:
+            index = self._indexes[namespace] = HammingIndex(self.max_distance)
+        return index
+
+    def _remove(self, namespace: str, image_hash: int):
+        self._entries.pop((namespace, image_hash), None)
+        index = self._indexes.get(namespace)
+        if index is not None:
+            index.remove(image_hash)
+            if not len(index):
+                del self._indexes[namespace]
+
+    def add(self, namespace: str, image_hash: int, cache_key: str):
+        self._index(namespace).add(image_hash, cache_key)
+        entry = (namespace, image_hash)
+        self._entries[entry] = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries.move_to_end(entry)
+
+        while len(self._entries) > self.max_entries:
+            (old_namespace, old_hash), _ = next(iter(self._entries.items()))
+            self._remove(old_namespace, old_hash)
+            self.evictions += 1
+
+    async def find(self, namespace: str, image_hash: int) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached analysis of the nearest stored upload within the threshold
+        """
+        index = self._indexes.get(namespace)
+        if index is not None:
+            now = time.monotonic()
+            for distance, stored_hash, cache_key in index.search(image_hash):
+                expires_at = self._entries.get((namespace, stored_hash))
+                cached = None
+                if expires_at is None or expires_at > now:
+                    cached = await analysis_cache.get(cache_key)
+                if cached is not None:
+                    self._entries.move_to_end((namespace, stored_hash))
+                    self.hits += 1
+                    return {**cached, "near_duplicate_distance": distance}
+                # The analysis expired from every cache tier, so drop the stale hash
+                self._remove(namespace, stored_hash)
+
+        self.misses += 1
+        return None
+
+    async def warm(self):
+        """
+        Rebuild the index from the most recent hashes stored alongside the Mongo
+        analysis cache, up to max_entries
+        """
+        if not analysis_cache.use_mongo:
+            return
+
+        try:
+            collection = await analysis_cache.collection()
+            cursor = collection.find(
+                {"phash": {"$exists": True}, "expires_at": {"$gt": datetime.utcnow()}},
+                {"phash": 1},
+            ).sort("created_at", -1).limit(self.max_entries)
+            docs = await cursor.to_list(length=self.max_entries)
+            # Oldest first, so the newest hashes end up most recently used
+            for doc in reversed(docs):
+                namespace = doc["_id"].rsplit(":", 1)[0]
+                self.add(namespace, int(doc["phash"], 16), doc["_id"])
+            logger.info(f"Loaded {len(docs)} perceptual hashes into the near-duplicate index")
+        except Exception as e:
+            logger.error(f"Could not warm near-duplicate index: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_distance": self.max_distance,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+near_duplicate_index = NearDuplicateIndex(
+    max_distance=settings.NEAR_DUPLICATE_MAX_DISTANCE,
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+)
+
+
+async def warm_near_duplicate_index():
+    if settings.NEAR_DUPLICATE_ENABLED:
+        await near_duplicate_index.warm()
@@ -0,0 +1,245 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+
+# The instructions go in the system message and the image goes last, so every
+# request for a given version starts with an identical prefix that provider-side
+# prompt caching can reuse. Register a new version rather than editing one in
+# place: the version is part of the analysis cache key.
+
+USER_TEXT = "Analyze the flower in this image."
+
+FULL_PROMPT = """
+You are a plant health analysis expert. Your task is to analyze a flower's condition based on an image input and provide your insights in a JSON formatted string that exactly matches the schema below. Do not include any additional commentary or text outside of the JSON string.
+
+The JSON schema is as follows:
+
+{
+  "glbFileUrl": string,
+  "parameters": {
+    "colorVibrancy": {
+      "score": int,
+      "explanation": string
+    },
+    "leafAreaIndex": {
+      "score": int,
+      "explanation": string
+    },
+    "wilting": {
+      "score": int,
+      "explanation": string
+    },
+    "spotting": {
+      "score": int,
+      "explanation": string
+    },
+    "symmetry": {
+      "score": int,
+      "explanation": string
+    }
+  },
+  "name": string,
+  "walletID": string,
+  "price": int,
+  "special": [
+    {
+      "attribute": string,
+      "rarity": int
+    }
+  ]
+}
+
+For each field, follow these guidelines:
+
+1. **glbFileUrl:**  
+     - leave blank
+2. **parameters:**  
+   This object contains detailed analyses of specific health indicators:
+   
+   - **colorVibrancy:**  
+     - Evaluate the intensity, saturation, and uniformity of the flower's colors.
+     - Write a two-sentence explanation discussing the brightness, vividness, and any fading or color inconsistencies.
+     - Assign an integer score where a higher score represents excellent color vibrancy.
+     
+   - **leafAreaIndex:**  
+     - Assess the density and coverage of the leaves relative to the flower.
+     - Write a two-sentence explanation that describes whether the foliage is abundant and how it contributes to the overall health.
+     - Assign an integer score where a higher score indicates an optimal leaf area.
+     
+   - **wilting:**  
+     - Determine if there are any signs of wilting, such as drooping or sagging petals and leaves.
+     - Write a two-sentence explanation detailing whether the tissues are firm and hydrated or showing signs of dehydration and drooping.
+     - Assign an integer score where a higher score indicates minimal or no wilting.
+     
+   - **spotting:**  
+     - Identify any spots, blemishes, or discolorations that may signal disease or pest damage.
+     - Write a two-sentence explanation describing the severity and distribution of any spotting observed.
+     - Assign an integer score where a higher score indicates fewer or negligible spotting issues.
+     
+   - **symmetry:**  
+     - Evaluate the overall symmetry of the flower, including the arrangement of petals, leaves, and stem.
+     - Write a two-sentence explanation discussing whether the structure is balanced and regular or irregular and disorganized.
+     - Assign an integer score where a higher score indicates greater symmetry.
+
+3. **name:**  
+   - Provide a string representing the name of the flower or the product derived from it.
+
+4. **walletID:**  
+   - Provide a string that represents the wallet ID associated with this analysis or transaction.
+
+5. **price:**  
+   - Provide an integer representing the price of the product, analysis, or associated item.
+6. **special:**
+   - Provide an array of objects with the following properties:
+     - **attribute:** string, the attribute of the flower
+     - **rarity:** integer, the rarity of the attribute from 1 to 5
+
+**Examples:**
+Below are three examples of correctly formatted outputs:
+
+### Example 1: Healthy Flower Analysis
+**Image Description:**  
+The image shows a vibrant red rose in full bloom. The petals are evenly arranged and glossy with visible dewdrops, supported by lush green leaves and a strong, upright stem. The softly blurred background emphasizes the flower's vivid color and intricate details.
+
+"
+{"glbFileUrl":"","parameters":{"colorVibrancy":{"score":95,"explanation":"The red hue is rich and vibrant, complemented by subtle shading that enhances depth and freshness."},"leafAreaIndex":{"score":85,"explanation":"The foliage is dense, contributing to strong photosynthetic capability and a balanced aesthetic."},"wilting":{"score":97,"explanation":"No signs of wilting; petals and leaves appear fresh and well-hydrated."},"spotting":{"score":100,"explanation":"No visible blemishes or spots, indicating excellent health and optimal environmental conditions."},"symmetry":{"score":96,"explanation":"The petals and leaves are arranged in a near-perfect symmetrical pattern, reflecting strong genetic traits."}},"name":"Radiant Scarlet Rose","walletID":"0xDEF123ABC456XYZ789","price":250,"special":[{"attribute":"Rare Fragrance","rarity":5},{"attribute":"High Petal Count","rarity":4}]}
+"
+
+### Example 2: Moderately Healthy Flower Analysis
+**Image Description:**  
+A sunflower with bright yellow petals, slightly curled at the edges. The center is well-defined, but a few leaves show minor signs of damage. The background features a bright blue sky.
+
+"
+{"glbFileUrl":"","parameters":{"colorVibrancy":{"score":80,"explanation":"The yellow petals are vivid, though slight fading is visible at the tips."},"leafAreaIndex":{"score":70,"explanation":"Leaf coverage is sufficient but not dense; some minor gaps are present."},"wilting":{"score":85,"explanation":"Most petals are firm, but the edges of a few show curling."},"spotting":{"score":65,"explanation":"A few minor brown spots on the lower leaves indicate slight environmental stress."},"symmetry":{"score":78,"explanation":"The overall form is well-balanced, but a few petals are slightly uneven."}},"name":"Golden Helios Sunflower","walletID":"0x987XYZ654DEF321ABC","price":120,"special":[{"attribute":"High Sun Resistance","rarity":3},{"attribute":"Large Seed Head","rarity":2}]}
+"
+
+### Example 3: Unhealthy Flower Analysis
+**Image Description:**  
+A pale, wilted flower with drooping petals and a visibly weakened stem. The background is dull and low-contrast, emphasizing signs of decay such as brown patches and uneven discoloration.
+
+"
+{"glbFileUrl":"","parameters":{"colorVibrancy":{"score":30,"explanation":"The color is faded, with noticeable discoloration and brown patches on the petals."},"leafAreaIndex":{"score":40,"explanation":"The leaf coverage is sparse, with significant gaps due to withering."},"wilting":{"score":20,"explanation":"Petals and leaves appear shriveled and drooping, indicating severe dehydration."},"spotting":{"score":25,"explanation":"Dark spots and necrotic patches indicate signs of disease or pest infestation."},"symmetry":{"score":35,"explanation":"The petals and leaves are asymmetrically arranged, suggesting poor growth conditions."}},"name":"Faded Elegance Lily","walletID":"0x654XYZ987DEF321ABC","price":30,"special":[{"attribute":"Unusual Petal Curling","rarity":2}]}
+"
+Return only the final JSON string as your output.
+"""
+
+COMPACT_PROMPT = """
+You are a plant health analysis expert. Analyze the flower in the image and reply with a single JSON object, with no other text, matching this schema:
+
+{"glbFileUrl": "", "parameters": {"colorVibrancy": P, "leafAreaIndex": P, "wilting": P, "spotting": P, "symmetry": P}, "name": string, "walletID": string, "price": int, "special": [{"attribute": string, "rarity": int}]}
+
+where P is {"score": int 0-100, "explanation": string of two sentences}. A higher score is always healthier:
+- colorVibrancy: intensity, saturation and uniformity of colour; note fading or inconsistencies.
+- leafAreaIndex: density and coverage of foliage relative to the flower.
+- wilting: firmness and hydration of petals and leaves (high = no wilting).
+- spotting: spots, blemishes or discolouration from disease or pests (high = none).
+- symmetry: balance and regularity of petals, leaves and stem.
+
+glbFileUrl is always "". name is a name for the flower. walletID is a wallet ID string. price is an integer price. special lists notable attributes, each with a rarity from 1 to 5.
+
+Example:
+{"glbFileUrl":"","parameters":{"colorVibrancy":{"score":80,"explanation":"The yellow petals are vivid. Slight fading is visible at the tips."},"leafAreaIndex":{"score":70,"explanation":"Leaf coverage is sufficient but not dense. Some minor gaps are present."},"wilting":{"score":85,"explanation":"Most petals are firm. The edges of a few show curling."},"spotting":{"score":65,"explanation":"A few brown spots mark the lower leaves. This suggests slight environmental stress."},"symmetry":{"score":78,"explanation":"The overall form is well balanced. A few petals are slightly uneven."}},"name":"Golden Helios Sunflower","walletID":"0x987XYZ654DEF321ABC","price":120,"special":[{"attribute":"High Sun Resistance","rarity":3}]}
+"""
+
+
+@dataclass(frozen=True)
+class PromptVersion:
+    version: str
+    system: str
+    description: str
+    user_text: str = USER_TEXT
+
+
+@dataclass
+class PromptStats:
+    """
+    Token usage and latency observed for one prompt version
+    """
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    image_tokens: int = 0
+    completion_tokens: int = 0
+    latency_seconds: float = 0.0
+
+    def record(self, usage: Dict[str, int], latency_seconds: float, image_tokens: int = 0):
+        self.requests += 1
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.image_tokens += image_tokens if usage else 0
+        self.cached_prompt_tokens += usage.get("cached_prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.latency_seconds += latency_seconds
+
+    def summary(self) -> Dict[str, Any]:
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "avg_prompt_tokens": self.prompt_tokens / requests,
+            "avg_cached_prompt_tokens": self.cached_prompt_tokens / requests,
+            "avg_image_tokens": self.image_tokens / requests,
+            "avg_completion_tokens": self.completion_tokens / requests,
+            "avg_latency_seconds": self.latency_seconds / requests,
+        }
+
+
+PROMPTS: Dict[str, PromptVersion] = {}
+PROMPT_STATS: Dict[str, PromptStats] = {}
+
+
+def register_prompt(prompt: PromptVersion):
+    if prompt.version in PROMPTS:
+        raise ValueError(f"Prompt version {prompt.version} is already registered")
+    PROMPTS[prompt.version] = prompt
+    PROMPT_STATS[prompt.version] = PromptStats()
+
+
+def get_prompt(version: str) -> PromptVersion:
+    try:
+        return PROMPTS[version]
+    except KeyError:
+        raise ValueError(f"Unknown prompt version: {version}")
+
+
+def select_prompt(content_hash: Optional[str] = None) -> PromptVersion:
+    """
+    Pick the prompt version for a request. When an A/B variant is configured, a stable
+    PROMPT_AB_FRACTION of uploads (bucketed by content hash) get the variant, so
+    retries of the same image always land in the same arm.
+    """
+    if settings.PROMPT_AB_VERSION and settings.PROMPT_AB_FRACTION > 0:
+        key = content_hash or ""
+        bucket = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16) / 0x100000000
+        if bucket < settings.PROMPT_AB_FRACTION:
+            return get_prompt(settings.PROMPT_AB_VERSION)
+    return get_prompt(settings.PROMPT_VERSION)
+
+
+def build_messages(prompt: PromptVersion, image_url: str, detail: str) -> List[Dict[str, Any]]:
+    return [
+        {"role": "system", "content": prompt.system.strip()},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt.user_text},
+                {"type": "image_url", "image_url": {"url": image_url, "detail": detail}},
+            ],
+        },
+    ]
+
+
+def prompt_stats() -> Dict[str, Any]:
+    return {version: stats.summary() for version, stats in PROMPT_STATS.items() if stats.requests}
+
+
+register_prompt(PromptVersion(
+    version="v3",
+    system=FULL_PROMPT,
+    description="Full instructions with three worked examples",
+))
+register_prompt(PromptVersion(
+    version="v3-compact",
+    system=COMPACT_PROMPT,
+    description="Condensed guidelines with a single example",
+))
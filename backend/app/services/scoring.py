@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import io
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+from PIL import Image
+
+# numpy is imported inside the functions that need it: they run in the scoring
+# processes, and the web process doesn't pay for the import at startup
+if TYPE_CHECKING:
+    import numpy as np
+
+# Scorers run on a thumbnail; colour statistics don't need more pixels than this
+SCORING_MAX_EDGE = 256
+
+# Hue bands on PIL's 0-255 HSV scale
+GREEN_HUE = (50, 120)    # ~70-170 degrees
+BROWN_HUE = (5, 30)      # ~7-42 degrees
+
+Scorer = Callable[["np.ndarray"], Tuple[float, Dict[str, float]]]
+
+SCORERS: Dict[str, Tuple[Scorer, float]] = {}
+
+
+def register_scorer(name: str, weight: float = 1.0):
+    """
+    Register a local scorer. A scorer receives an HxWx3 float32 HSV array with
+    channels in [0, 1] and returns a 0-100 score plus the metrics behind it.
+    """
+    def decorator(func: Scorer) -> Scorer:
+        SCORERS[name] = (func, weight)
+        return func
+    return decorator
+
+
+def _green_mask(hsv: np.ndarray) -> np.ndarray:
+    h, s, v = hsv[..., 0] * 255, hsv[..., 1], hsv[..., 2]
+    return (h >= GREEN_HUE[0]) & (h <= GREEN_HUE[1]) & (s > 0.2) & (v > 0.15)
+
+
+def _brown_mask(hsv: np.ndarray) -> np.ndarray:
+    h, s, v = hsv[..., 0] * 255, hsv[..., 1], hsv[..., 2]
+    return (h >= BROWN_HUE[0]) & (h <= BROWN_HUE[1]) & (s > 0.3) & (v > 0.1) & (v < 0.6)
+
+
+@register_scorer("color_saturation")
+def color_saturation(hsv: np.ndarray) -> Tuple[float, Dict[str, float]]:
+    """
+    Share of reasonably lit pixels that are vividly coloured
+    """
+    import numpy as np
+
+    lit = hsv[..., 2] > 0.15
+    saturation = hsv[..., 1][lit]
+    if saturation.size == 0:
+        return 0.0, {"vivid_fraction": 0.0, "mean_saturation": 0.0}
+    histogram, _ = np.histogram(saturation, bins=10, range=(0.0, 1.0))
+    vivid = histogram[4:].sum() / saturation.size
+    return float(min(1.0, vivid / 0.6) * 100), {
+        "vivid_fraction": float(vivid),
+        "mean_saturation": float(saturation.mean()),
+    }
+
+
+@register_scorer("leaf_coverage")
+def leaf_coverage(hsv: np.ndarray) -> Tuple[float, Dict[str, float]]:
+    """
+    Fraction of the frame covered by green foliage
+    """
+    coverage = float(_green_mask(hsv).mean())
+    return min(1.0, coverage / 0.35) * 100, {"green_fraction": coverage}
+
+
+@register_scorer("brown_spots")
+def brown_spots(hsv: np.ndarray) -> Tuple[float, Dict[str, float]]:
+    """
+    Brown, necrotic-looking pixels relative to all plant pixels (higher score = fewer)
+    """
+    green = int(_green_mask(hsv).sum())
+    brown = int(_brown_mask(hsv).sum())
+    plant = green + brown
+    ratio = brown / plant if plant else 0.0
+    return (1.0 - min(1.0, ratio / 0.25)) * 100, {"brown_ratio": ratio}
+
+
+def load_hsv(data: bytes) -> np.ndarray:
+    import numpy as np
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (SCORING_MAX_EDGE, SCORING_MAX_EDGE))
+        image = image.convert("RGB")
+        image.thumbnail((SCORING_MAX_EDGE, SCORING_MAX_EDGE))
+        return np.asarray(image.convert("HSV"), dtype=np.float32) / 255.0
+
+
+def score_image(data: bytes, scorer_names: List[str]) -> Dict[str, object]:
+    """
+    Run the named scorers over an encoded image and combine them into a weighted
+    0-100 score. Deterministic, and cheap enough to run per request; call it
+    through run_in_process_pool.
+    """
+    hsv = load_hsv(data)
+    components = {}
+    metrics = {}
+    total_weight = 0.0
+    weighted = 0.0
+    for name in scorer_names:
+        scorer, weight = SCORERS[name]
+        score, scorer_metrics = scorer(hsv)
+        components[name] = round(score, 2)
+        metrics.update(scorer_metrics)
+        weighted += score * weight
+        total_weight += weight
+
+    return {
+        "score": round(weighted / total_weight, 2) if total_weight else 0.0,
+        "components": components,
+        "metrics": metrics,
+    }
@@ -1,31 +1,111 @@
+import json
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from bson import ObjectId
+from bson.errors import InvalidId
+from ..core.cache import ReadThroughCache
+from ..core.config import settings
 from ..core.database import get_database
+from ..core.telemetry import span
+from ..schemas.user import UserResponse
+
+# Only fetch the fields UserResponse exposes
+USER_PROJECTION = {field: 1 for field in UserResponse.model_fields if field != "id"}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _serialize_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    # Convert ObjectId to string for JSON serialization
+    user["id"] = str(user.pop("_id"))
+    return user
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_cursor(after: Optional[str]) -> Dict[str, Any]:
+    if not after:
+        return {}
+    try:
+        return {"_id": {"$gt": ObjectId(after)}}
+    except (InvalidId, TypeError):
+        raise InvalidCursor(f"Invalid cursor: {after}")
+
 
 class UserService:
     @staticmethod
-    async def get_all_users():
+    async def get_all_users(limit: int = 100, after: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
-        Get all users
+        Get one page of users ordered by _id, starting after the `after` cursor.
+        Returns the page and the cursor for the next one (None on the last page).
         """
         db = await get_database()
-        users = await db["users"].find().to_list(length=None)
-        
-        # Convert ObjectId to string for JSON serialization
-        for user in users:
-            user["id"] = str(user["_id"])
-            del user["_id"]
-            
-        return users
+        # Keyset pagination on the built-in _id index: each page is an index range
+        # scan, so deep pages cost the same as the first one
+        with span("mongo.users.page", limit=limit):
+            users = await db["users"].find(
+                _parse_cursor(after), USER_PROJECTION
+            ).sort("_id", 1).limit(limit + 1).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = str(users[-1]["_id"])
+
+        return [_serialize_user(user) for user in users], next_cursor
 
     @staticmethod
-    async def get_user(user_id: str):
+    def stream_users(after: Optional[str] = None, batch_size: int = 1000) -> AsyncIterator[str]:
         """
-        Get a specific user
+        Stream every user after the cursor as NDJSON lines, as the Mongo cursor
+        yields them. The cursor is validated before anything is streamed.
         """
+        query = _parse_cursor(after)
+
+        async def lines():
+            db = await get_database()
+            cursor = db["users"].find(query, USER_PROJECTION).sort("_id", 1).batch_size(batch_size)
+            async for user in cursor:
+                yield json.dumps(_serialize_user(user), default=_json_default) + "\n"
+
+        return lines()
+
+    @staticmethod
+    async def _load_user(user_id: str):
         db = await get_database()
-        user = await db["users"].find_one({"_id": ObjectId(user_id)})
+        with span("mongo.users.get"):
+            user = await db["users"].find_one({"_id": ObjectId(user_id)})
         if user:
             user["id"] = str(user["_id"])
             del user["_id"]
-        return user 
\ No newline at end of file
+        return user
+
+    @staticmethod
+    async def get_user(user_id: str):
+        """
+        Get a specific user, served from the user cache when possible
+        """
+        user = await user_cache.get(user_id)
+        # Copy so callers can't mutate the cached document
+        return dict(user) if user else None
+
+    @staticmethod
+    def invalidate_user(user_id: str):
+        """
+        Call after changing a user document so the next read sees the change
+        """
+        user_cache.invalidate(user_id)
+
+
+user_cache = ReadThroughCache(
+    UserService._load_user,
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.USER_CACHE_NEGATIVE_TTL_SECONDS,
+)
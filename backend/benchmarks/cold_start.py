@@ -0,0 +1,131 @@
+"""
+Cold start profile: import time of main (via -X importtime) and time from process
+spawn to the first successful request, with and without LAZY_STARTUP.
+
+    cd backend
+    python -m benchmarks.cold_start --runs 5 --target-ms 1500
+
+The backend is started against local fakes and whatever MONGODB_URL is set (an
+unreachable one is fine: with LAZY_STARTUP the first request should not wait on
+it). Exits non-zero if the lazy median time-to-first-request misses the target.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+from .fakes import free_port
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def bench_env(lazy: bool) -> Dict[str, str]:
+    env = {**os.environ, "LAZY_STARTUP": "true" if lazy else "false", "LOG_LEVEL": "WARNING"}
+    for name in ("ALLOWED_HOSTS", "CORS_ALLOWED_ORIGINS", "LANGSMITH_ENDPOINT", "LANGSMITH_API_KEY",
+                 "LANGSMITH_PROJECT", "OPENAI_API_KEY", "MONGODB_DB_NAME", "SECRET_KEY"):
+        env.setdefault(name, "bench")
+    env.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+    return env
+
+
+def import_profile(top: int) -> Tuple[float, List[Dict[str, float]]]:
+    """
+    Total import time of main and the slowest top-level packages by cumulative time
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=bench_env(lazy=True), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    # Lines are printed as each import finishes, so main's direct imports (one
+    # nesting level down) are the entries just before the top-level "main" line
+    children: List[Tuple[str, int]] = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == "main":
+                total_us = int(cumulative)
+                break
+            children = []
+        elif depth == 1:
+            children.append((name, int(cumulative)))
+
+    packages: Dict[str, int] = {}
+    for name, cumulative in children:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + cumulative
+
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total_us / 1000, [{"module": name, "ms": round(us / 1000, 1)} for name, us in slowest]
+
+
+def time_to_first_request(lazy: bool, path: str, timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=bench_env(lazy),
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Backend exited with status {process.returncode}")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}{path}", timeout=timeout)
+                return (time.perf_counter() - started) * 1000
+            except httpx.TransportError:
+                time.sleep(0.01)
+        raise RuntimeError(f"No response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=1500)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    import_ms, slowest = import_profile(args.top)
+    print(json.dumps({"import_main_ms": round(import_ms, 1), "slowest_imports": slowest}, indent=2))
+
+    medians = {}
+    for lazy in (False, True):
+        samples = [time_to_first_request(lazy, args.path, args.timeout) for _ in range(args.runs)]
+        medians[lazy] = statistics.median(samples)
+        print(json.dumps({
+            "lazy_startup": lazy,
+            "time_to_first_request_ms": {
+                "median": round(medians[lazy], 1),
+                "min": round(min(samples), 1),
+                "max": round(max(samples), 1),
+            },
+        }))
+
+    met = medians[True] <= args.target_ms
+    print(f"Lazy median {medians[True]:.0f}ms vs target {args.target_ms:.0f}ms: {'met' if met else 'MISSED'}")
+    sys.exit(0 if met else 1)
+
+
+if __name__ == "__main__":
+    main()
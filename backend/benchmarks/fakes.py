@@ -0,0 +1,246 @@
+"""
+Local stand-ins for the OpenAI chat-completions API and the NEAR mint service, so
+the backend can be load tested without spending credits or touching Render.
+
+    cd backend
+    python -m benchmarks.fakes --openai-latency lognormal:800:0.4 --openai-error-rate 0.02
+
+Latency specs are "const:MS", "uniform:LOW_MS:HIGH_MS", "normal:MEAN_MS:STD_MS" or
+"lognormal:MEDIAN_MS:SIGMA". A failing request answers error_status after its
+latency, with a Retry-After header when that status is 429.
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANALYSIS = {
+    "glbFileUrl": "",
+    "parameters": {
+        "colorVibrancy": {"score": 82, "explanation": "Petals are saturated and evenly coloured."},
+        "leafAreaIndex": {"score": 74, "explanation": "Foliage covers most of the visible stem."},
+        "wilting": {"score": 88, "explanation": "Leaves and petals are turgid."},
+        "spotting": {"score": 91, "explanation": "No visible lesions or discolouration."},
+        "symmetry": {"score": 69, "explanation": "Growth leans slightly toward the light."},
+    },
+    "name": "Benchmark Bloom",
+    "walletID": "",
+    "price": 120,
+    "special": [{"attribute": "Synthetic", "rarity": 3}],
+}
+
+
+@dataclass
+class LatencyModel:
+    kind: str
+    a: float
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, *values = spec.split(":")
+        values = [float(value) for value in values]
+        if kind not in ("const", "uniform", "normal", "lognormal") or not values:
+            raise ValueError(f"Invalid latency spec {spec!r}")
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        One latency in seconds
+        """
+        if self.kind == "const":
+            ms = self.a
+        elif self.kind == "uniform":
+            ms = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            ms = rng.gauss(self.a, self.b)
+        else:
+            ms = self.a * rng.lognormvariate(0.0, self.b)
+        return max(0.0, ms) / 1000
+
+
+@dataclass
+class FaultModel:
+    latency: LatencyModel
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        self.requests = 0
+        self.errors = 0
+
+    async def apply(self) -> Optional[JSONResponse]:
+        """
+        Sleep for a sampled latency and return an error response for the failing fraction
+        """
+        self.requests += 1
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if self.rng.random() >= self.error_rate:
+            return None
+        self.errors += 1
+        headers = {"Retry-After": "1"} if self.error_status == 429 else None
+        return JSONResponse(
+            {"error": {"message": "Injected failure", "type": "fake_error"}},
+            status_code=self.error_status,
+            headers=headers,
+        )
+
+
+def build_openai_app(faults: FaultModel) -> FastAPI:
+    fake = FastAPI()
+    content = json.dumps(ANALYSIS)
+
+    @fake.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = await faults.apply()
+        if error is not None:
+            return error
+
+        created = int(time.time())
+        prompt_tokens = 1200
+        completion_tokens = len(content) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 1024},
+        }
+        base = {"id": "chatcmpl-fake", "created": created, "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        async def chunks():
+            for start in range(0, len(content), 16):
+                delta = {"content": content[start:start + 16]}
+                yield "data: " + json.dumps({**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": None},
+                ]}) + "\n\n"
+            yield "data: " + json.dumps({**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {}, "finish_reason": "stop"},
+            ]}) + "\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield "data: " + json.dumps({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @fake.get("/stats")
+    async def stats():
+        return {"requests": faults.requests, "errors": faults.errors}
+
+    return fake
+
+
+def build_near_app(faults: FaultModel) -> FastAPI:
+    fake = FastAPI()
+
+    def minted(payload: dict) -> dict:
+        return {
+            "transaction_hash": f"fake-{payload.get('token_id')}",
+            "token_id": payload.get("token_id"),
+            "receiver": payload.get("receiver_id"),
+            "metadata": payload.get("plant_metadata"),
+        }
+
+    @fake.post("/api/nft/mint")
+    async def mint(payload: dict):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        return minted(payload)
+
+    @fake.post("/api/nft/mint/bulk")
+    async def mint_bulk(payload: dict):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        return {"results": [minted(item) for item in payload["mints"]]}
+
+    @fake.get("/stats")
+    async def stats():
+        return {"requests": faults.requests, "errors": faults.errors}
+
+    return fake
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app: FastAPI, port: Optional[int] = None) -> str:
+    """
+    Serve app on a background thread and return its base URL
+    """
+    port = port or free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--openai-latency", default="lognormal:800:0.4")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-error-status", type=int, default=500)
+    parser.add_argument("--near-latency", default="lognormal:300:0.5")
+    parser.add_argument("--near-error-rate", type=float, default=0.0)
+    parser.add_argument("--near-error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def start_fakes(args) -> dict:
+    """
+    Start both fakes from parsed fault arguments; returns their base URLs
+    """
+    openai_url = start_server(build_openai_app(FaultModel(
+        LatencyModel.parse(args.openai_latency), args.openai_error_rate, args.openai_error_status, args.seed
+    )))
+    near_url = start_server(build_near_app(FaultModel(
+        LatencyModel.parse(args.near_latency), args.near_error_rate, args.near_error_status, args.seed
+    )))
+    return {"openai": f"{openai_url}/v1", "near": f"{near_url}/api/nft"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    urls = start_fakes(args)
+    print(f"OPENAI_BASE_URL={urls['openai']}")
+    print(f"NEAR_API_URL={urls['near']}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
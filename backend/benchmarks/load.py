@@ -0,0 +1,324 @@
+"""
+Load test the backend end to end against local fakes of OpenAI and the NEAR mint
+service (see benchmarks.fakes). Needs a local mongod.
+
+    cd backend
+    python -m benchmarks.load new --requests 200 --concurrency 16
+    python -m benchmarks.load mint --requests 1000 --concurrency 50 --near-latency const:200
+    python -m benchmarks.load users --requests 2000 --concurrency 50 --seed-users 10000
+    python -m benchmarks.load compare new
+
+The backend runs as a separate uvicorn process so its peak RSS (VmHWM, Linux only)
+is measured on its own. Each run appends a JSON line with the git commit, the
+parameters and the results to benchmarks/results/<scenario>.jsonl; `compare`
+prints the latest result for each commit side by side. A run whose warm-up or
+measured requests are not all 2xx exits non-zero and is not saved.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .fakes import add_fault_arguments, free_port, start_fakes
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DB_NAME = "bench_load"
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """
+    High-water resident set size of a process, from /proc (Linux only)
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def plant_image(width: int = 640, height: int = 480, quality: int = 90) -> bytes:
+    """
+    A sharp, green, textured JPEG that passes the local quality gate
+    """
+    from PIL import Image, ImageOps
+
+    noise = Image.effect_noise((width, height), 64)
+    image = ImageOps.colorize(noise, black=(20, 70, 15), white=(110, 210, 70))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def start_backend(port: int, urls: Dict[str, str], args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": urls["openai"],
+        "OPENAI_API_KEY": "bench",
+        "NEAR_API_URL": urls["near"],
+        "MONGODB_URL": args.mongodb_url,
+        "MONGODB_DB_NAME": DB_NAME,
+        # Every request should reach the (fake) vision model
+        "ANALYSIS_CACHE_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    for name in ("ALLOWED_HOSTS", "CORS_ALLOWED_ORIGINS", "LANGSMITH_ENDPOINT", "LANGSMITH_API_KEY", "LANGSMITH_PROJECT", "SECRET_KEY"):
+        env.setdefault(name, "bench")
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with status {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not become healthy within 30s")
+
+
+async def seed_users(mongodb_url: str, count: int):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongodb_url)
+    users = client[DB_NAME]["users"]
+    await users.drop()
+    for offset in range(0, count, 10_000):
+        await users.insert_many([
+            {"username": f"user{i}", "email": f"user{i}@bench.local", "created_at": datetime.utcnow(), "is_active": True}
+            for i in range(offset, min(count, offset + 10_000))
+        ])
+    client.close()
+
+
+class BenchmarkFailed(Exception):
+    """
+    The run did not exercise the path it meant to measure, so its numbers are not saved
+    """
+
+
+def build_scenario(name: str, args) -> Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]:
+    if name == "new":
+        image = plant_image()
+
+        async def new_model(client: httpx.AsyncClient, i: int) -> httpx.Response:
+            return await client.post("/v1/model/new/", data={
+                "userId": "bench",
+                # Form(...) treats an empty string as missing and answers 422
+                "imageUrl": "https://example.com/plant.jpg",
+                "model_name": f"bench-{i}",
+            }, files={"model_image_file": ("plant.jpg", image, "image/jpeg")})
+        return new_model
+
+    if name == "mint":
+        run_id = uuid.uuid4().hex[:8]
+
+        async def mint(client: httpx.AsyncClient, i: int) -> httpx.Response:
+            return await client.post("/v1/model/mint/", json={
+                "token_id": f"bench-{run_id}-{i}",
+                "receiver_id": "bench.testnet",
+                "plant_metadata": {"glb_file_url": "", "parameters": {}, "name": "bench", "wallet_id": "bench", "price": 1},
+            })
+        return mint
+
+    async def users(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/v1/users/", params={"limit": args.page_size})
+    return users
+
+
+async def drive(base_url: str, scenario, requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    bodies: List[Any] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for i in range(warmup):
+            response = await scenario(client, -1 - i)
+            if not response.is_success:
+                raise BenchmarkFailed(
+                    f"Warm-up request answered {response.status_code}: {response.text[:500]}"
+                )
+
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await scenario(client, i)
+                    status = str(response.status_code)
+                    if response.status_code == 202:
+                        bodies.append(response.json())
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "success_ratio": round(ok / requests, 4) if requests else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "_jobs": [body["data"]["job_id"] for body in bodies if "data" in body],
+    }
+
+
+async def drain_mints(base_url: str, job_ids: List[str], timeout: float) -> Dict[str, Any]:
+    """
+    Poll queued mint jobs until they all settle, to measure end-to-end mint throughput
+    """
+    started = time.perf_counter()
+    pending = set(job_ids)
+    settled: Dict[str, int] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        while pending and time.perf_counter() - started < timeout:
+            for job_id in list(pending):
+                job = (await client.get(f"/v1/model/mint/{job_id}")).json()
+                if job.get("status") in ("succeeded", "failed"):
+                    pending.discard(job_id)
+                    settled[job["status"]] = settled.get(job["status"], 0) + 1
+            if pending:
+                await asyncio.sleep(0.25)
+    return {"drain_seconds": round(time.perf_counter() - started, 3), "jobs": settled, "unsettled": len(pending)}
+
+
+def save(scenario: str, record: Dict[str, Any]) -> Path:
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"{scenario}.jsonl"
+    with path.open("a") as results:
+        results.write(json.dumps(record) + "\n")
+    return path
+
+
+def compare(scenario: str):
+    path = RESULTS_DIR / f"{scenario}.jsonl"
+    if not path.exists():
+        print(f"No results for {scenario} yet")
+        return
+    latest: Dict[str, Dict[str, Any]] = {}
+    for line in path.read_text().splitlines():
+        record = json.loads(line)
+        latest[record["commit"]] = record
+
+    print(f"{'commit':<10} {'when':<20} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ok':>7} {'rss_mb':>8}")
+    for commit, record in latest.items():
+        result = record["result"]
+        latency = result["latency_ms"]
+        print(
+            f"{commit:<10} {record['timestamp'][:19]:<20} {result['throughput_rps']:>8} "
+            f"{latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8} "
+            f"{result['success_ratio']:>7} {str(result.get('peak_rss_mb')):>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenario", choices=["new", "mint", "users", "compare"])
+    parser.add_argument("compare_scenario", nargs="?", choices=["new", "mint", "users"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--seed-users", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--no-save", action="store_true")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    if args.scenario == "compare":
+        compare(args.compare_scenario or "new")
+        return
+
+    if args.seed_users:
+        asyncio.run(seed_users(args.mongodb_url, args.seed_users))
+
+    urls = start_fakes(args)
+    port = free_port()
+    backend = start_backend(port, urls, args)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        try:
+            result = asyncio.run(drive(base_url, build_scenario(args.scenario, args), args.requests, args.concurrency, args.warmup))
+        except BenchmarkFailed as e:
+            print(f"Benchmark failed, not saving: {e}", file=sys.stderr)
+            sys.exit(1)
+        job_ids = result.pop("_jobs")
+        if args.scenario == "mint" and job_ids:
+            result["mint_drain"] = asyncio.run(drain_mints(base_url, job_ids, args.drain_timeout))
+        result["peak_rss_mb"] = peak_rss_mb(backend.pid)
+    finally:
+        backend.terminate()
+        backend.wait(timeout=30)
+
+    record = {
+        "scenario": args.scenario,
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "params": {
+            key: value for key, value in vars(args).items()
+            if key not in ("scenario", "compare_scenario", "no_save", "mongodb_url")
+        },
+        "result": result,
+    }
+    print(json.dumps(record, indent=2))
+    if result["success_ratio"] < 1.0:
+        print(f"Benchmark failed, not saving: non-2xx responses {result['statuses']}", file=sys.stderr)
+        sys.exit(1)
+    if not args.no_save:
+        print(f"Saved to {save(args.scenario, record)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Mint throughput against a local stub of the NEAR mint service, comparing a new
+httpx.AsyncClient per call (the old behaviour), the shared pooled client, and
+the pooled client with request coalescing into bulk calls.
+
+    cd backend
+    python -m benchmarks.mint_throughput --mints 500 --concurrency 20
+
+The stub is plain HTTP on localhost, so this only captures TCP and HTTP setup;
+against the real TLS endpoint the per-call handshake cost is much larger.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from .fakes import FaultModel, LatencyModel, build_near_app, start_server
+
+
+async def run(mode: str, mints: int, concurrency: int):
+    from app.core.clients import close_clients
+    from app.core.config import settings
+    from app.services.model import ModelService
+
+    settings.MINT_BATCH_ENABLED = mode == "batched"
+
+    semaphore = asyncio.Semaphore(concurrency)
+    metadata = {"glb_file_url": "", "parameters": {}, "name": "bench", "wallet_id": "bench", "price": 1}
+
+    async def per_call(i: int):
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{settings.NEAR_API_URL}/mint", json={"token_id": str(i)})
+        return response.json()
+
+    async def pooled(i: int):
+        return await ModelService.mint_nft(str(i), "bench.testnet", metadata)
+
+    mint = per_call if mode == "per_call" else pooled
+
+    async def one(i: int):
+        async with semaphore:
+            await mint(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(mints)))
+    elapsed = time.perf_counter() - start
+    await close_clients()
+    return {"mode": mode, "mints": mints, "concurrency": concurrency,
+            "seconds": round(elapsed, 3), "mints_per_second": round(mints / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mints", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    near = build_near_app(FaultModel(LatencyModel("const", args.latency_ms)))
+    settings.NEAR_API_URL = f"{start_server(near)}/api/nft"
+
+    for mode in ("per_call", "pooled", "batched"):
+        print(json.dumps(asyncio.run(run(mode, args.mints, args.concurrency))))
+
+
+if __name__ == "__main__":
+    main()
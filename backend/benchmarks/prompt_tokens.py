@@ -0,0 +1,71 @@
+"""
+Input-token report per registered prompt version.
+
+Counts the system prefix and user text with tiktoken's o200k_base encoding (the
+gpt-4o family tokenizer) when tiktoken is installed, falling back to a rough
+four-characters-per-token estimate, and adds the image tokens the app budgets
+for (app.services.image_processing.image_tokens, with the VISION_IMAGE_*_TOKENS
+rates) for each detail level. It also shows which detail each VISION_DETAIL
+setting picks for common upload sizes and what that image costs.
+
+    cd backend
+    python -m benchmarks.prompt_tokens
+
+Measured usage and latency per version from a running server are reported under
+"prompts" on GET /v1/model/stats/.
+"""
+import json
+import math
+
+# Phone photo, square crop, small web image, thumbnail
+UPLOAD_SIZES = [(4032, 3024), (1024, 1024), (640, 480), (512, 384)]
+
+
+def token_counter():
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda text: math.ceil(len(text) / 4)), "estimate (chars / 4)"
+    encoding = tiktoken.get_encoding("o200k_base")
+    return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+
+
+def detail_policies():
+    """
+    Detail and image tokens per VISION_DETAIL setting for each upload size
+    """
+    from app.services.image_processing import choose_detail, image_tokens, target_size
+
+    rows = []
+    for width, height in UPLOAD_SIZES:
+        row = {"upload": f"{width}x{height}"}
+        for policy in ("low", "auto", "high"):
+            detail = choose_detail(width, height, policy)
+            row[policy] = {"detail": detail, "image_tokens": image_tokens(*target_size(width, height, detail), detail)}
+        rows.append(row)
+    return rows
+
+
+def main():
+    from app.services.image_processing import image_tokens
+    from app.services.prompts import PROMPTS
+
+    count, method = token_counter()
+    rows = []
+    for prompt in PROMPTS.values():
+        system_tokens = count(prompt.system.strip())
+        user_tokens = count(prompt.user_text)
+        rows.append({
+            "version": prompt.version,
+            "description": prompt.description,
+            "system_tokens": system_tokens,
+            "user_text_tokens": user_tokens,
+            "total_with_low_detail_image": system_tokens + user_tokens + image_tokens(512, 512, "low"),
+            "total_with_high_detail_image": system_tokens + user_tokens + image_tokens(1536, 2048, "high"),
+        })
+
+    print(json.dumps({"method": method, "versions": rows, "detail_policies": detail_policies()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
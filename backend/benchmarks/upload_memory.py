@@ -0,0 +1,137 @@
+"""
+Peak backend memory while it receives N concurrent multipart uploads.
+
+The backend runs as its own uvicorn process against the local fakes (see
+benchmarks.load), and N clients post a ~SIZE_MB plant image to it at the same
+time, so the number includes multipart parsing, spooling, ingestion and
+preprocessing. Peak RSS is the process's VmHWM (Linux only), reported next to
+the RSS it had once idle:
+
+    cd backend
+    python -m benchmarks.upload_memory --uploads 16 --size-mb 10
+    python -m benchmarks.upload_memory --uploads 16 --size-mb 10 --endpoint assets
+
+Without a local mongod, set LAZY_STARTUP=true so the backend starts anyway.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import jwt
+
+from .fakes import add_fault_arguments, free_port, start_fakes
+from .load import peak_rss_mb, plant_image, start_backend
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """
+    Current resident set size of a process, from /proc (Linux only)
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def large_plant_image(size_mb: float) -> bytes:
+    """
+    A plant_image scaled up until its JPEG is at least size_mb
+    """
+    target = size_mb * 1024 * 1024
+    width, height = 1600, 1200
+    while True:
+        image = plant_image(width, height, quality=100)
+        if len(image) >= target:
+            return image
+        scale = 1.05 * (target / len(image)) ** 0.5
+        width, height = int(width * scale), int(height * scale)
+
+
+def bearer_token() -> str:
+    """
+    A token the backend accepts: start_backend passes it this SECRET_KEY
+    """
+    claims = {"user_id": "bench", "username": "bench", "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, os.environ.get("SECRET_KEY", "bench"), algorithm="HS256")
+
+
+async def upload_all(base_url: str, endpoint: str, image: bytes, uploads: int) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=uploads, max_keepalive_connections=uploads)
+    # Asset uploads require a bearer token
+    headers = {"Authorization": f"Bearer {bearer_token()}"}
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300, headers=headers) as client:
+        async def upload(i: int):
+            try:
+                if endpoint == "assets":
+                    response = await client.post(
+                        "/v1/assets/", files={"file": ("plant.jpg", image, "image/jpeg")},
+                    )
+                else:
+                    response = await client.post("/v1/model/new/", data={
+                        "userId": "bench",
+                        "imageUrl": "https://example.com/plant.jpg",
+                        "model_name": f"upload-{i}",
+                    }, files={"model_image_file": ("plant.jpg", image, "image/jpeg")})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(i) for i in range(uploads)))
+        elapsed = time.perf_counter() - started
+
+    return {"seconds": round(elapsed, 3), "statuses": statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--endpoint", choices=["new", "assets"], default="new")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    image = large_plant_image(args.size_mb)
+    urls = start_fakes(args)
+    port = free_port()
+    backend = start_backend(port, urls, args)
+    try:
+        # Let lazy warm-up settle so the idle figure is a fair baseline
+        time.sleep(2)
+        idle = rss_mb(backend.pid)
+        result = asyncio.run(upload_all(f"http://127.0.0.1:{port}", args.endpoint, image, args.uploads))
+        peak = peak_rss_mb(backend.pid)
+    finally:
+        backend.terminate()
+        backend.wait(timeout=30)
+
+    ok = sum(count for status, count in result["statuses"].items() if status.startswith("2"))
+    print(json.dumps({
+        "endpoint": args.endpoint,
+        "uploads": args.uploads,
+        "upload_mb": round(len(image) / (1024 * 1024), 1),
+        "idle_rss_mb": idle,
+        "peak_rss_mb": peak,
+        "peak_over_idle_mb": round(peak - idle, 1) if peak is not None and idle is not None else None,
+        **result,
+    }, indent=2))
+    if ok != args.uploads:
+        print(f"Only {ok}/{args.uploads} uploads succeeded; the peak does not cover the full path", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
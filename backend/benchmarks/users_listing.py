@@ -0,0 +1,112 @@
+"""
+User listing against a local mongod with synthetic users: the old load-everything
+query versus keyset pages and the NDJSON stream.
+
+    cd backend
+    python -m benchmarks.users_listing --users 1000000 --mongodb-url mongodb://localhost:27017
+
+Users are seeded once into the bench_users database and reused on later runs
+(pass --reseed to rebuild). Each mode reports wall time and peak traced memory.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+DB_NAME = "bench_users"
+SEED_BATCH = 10_000
+
+
+async def seed(db, users: int):
+    await db["users"].drop()
+    start = datetime.utcnow()
+    for offset in range(0, users, SEED_BATCH):
+        await db["users"].insert_many([
+            {
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "created_at": start - timedelta(seconds=i),
+                "is_active": True,
+                "is_staff": False,
+                "is_superuser": False,
+                "first_name": "Bench",
+                "last_name": f"User{i}",
+                # Not part of UserResponse, so the projection should leave it behind
+                "preferences": {"theme": "dark", "history": list(range(20))},
+            }
+            for i in range(offset, min(offset + SEED_BATCH, users))
+        ], ordered=False)
+
+
+async def old_full_list(db):
+    users = await db["users"].find().to_list(length=None)
+    for user in users:
+        user["id"] = str(user["_id"])
+        del user["_id"]
+    return len(users)
+
+
+async def keyset_pages(db, page_size: int):
+    from app.services.users import UserService
+
+    count, cursor = 0, None
+    while True:
+        users, cursor = await UserService.get_all_users(limit=page_size, after=cursor)
+        count += len(users)
+        if cursor is None:
+            return count
+
+
+async def stream(db, page_size: int):
+    from app.services.users import UserService
+
+    count = 0
+    async for _ in UserService.stream_users(batch_size=page_size):
+        count += 1
+    return count
+
+
+async def measure(name: str, coro):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = await coro
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "mode": name,
+        "users": count,
+        "seconds": round(elapsed, 2),
+        "peak_traced_mb": round(peak / (1024 * 1024), 1),
+    }))
+
+
+async def main(args):
+    from app.core.database import Database
+
+    client = AsyncIOMotorClient(args.mongodb_url)
+    db = client[DB_NAME]
+    Database.client, Database.db = client, db
+
+    existing = await db["users"].estimated_document_count()
+    if args.reseed or existing != args.users:
+        print(f"Seeding {args.users} users...")
+        await seed(db, args.users)
+
+    await measure("old_full_list", old_full_list(db))
+    await measure("keyset_pages", keyset_pages(db, args.page_size))
+    await measure("ndjson_stream", stream(db, args.page_size))
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--reseed", action="store_true")
+    asyncio.run(main(parser.parse_args()))
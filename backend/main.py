@@ -1,9 +1,63 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.core.config import settings
 from app.api.v1.router import api_router
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.database import connect_to_mongo, close_mongo_connection, start_health_check, mongo_status
+from app.core.executors import shutdown_executors
+from app.core.clients import init_clients, close_clients
+from app.services.near_duplicates import warm_near_duplicate_index
+from app.services.mint_jobs import MintJobService
+from app.services.mint_batcher import mint_batcher
+from app.services.marketplace import MarketplaceService
+from app.services.analyses import analysis_writer
+from app.core.log import setup_logging, shutdown_logging, get_logger
+from app.core.telemetry import TracingMiddleware
+from app.core.uploads import BodySizeLimitMiddleware
+
+setup_logging()
+logger = get_logger(__name__)
+
+async def warm_up():
+    """
+    Startup work that needs MongoDB or builds heavy clients. Everything here is
+    also done on first use, so with LAZY_STARTUP it runs in the background.
+    """
+    await init_clients()
+    await MarketplaceService.ensure_indexes()
+    await warm_near_duplicate_index()
+
+async def _background_warm_up():
+    try:
+        await warm_up()
+        logger.info("Background warm-up finished")
+    except Exception as e:
+        logger.warning(f"Background warm-up failed, continuing lazily: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Creating the Mongo client does no I/O; the health check runs in the background
+    await connect_to_mongo()
+    start_health_check()
+    analysis_writer.start()
+    await MintJobService.start_workers()
+    warm_up_task = None
+    if settings.LAZY_STARTUP:
+        warm_up_task = asyncio.create_task(_background_warm_up())
+    else:
+        await warm_up()
+    yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await MintJobService.stop_workers()
+    await mint_batcher.close()
+    await close_clients()
+    await close_mongo_connection()
+    await shutdown_executors()
+    shutdown_logging()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -11,9 +65,21 @@ app = FastAPI(
     description=settings.PROJECT_DESCRIPTION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
+    lifespan=lifespan,
 )
 
-print(f"API prefix is: {settings.API_V1_STR}")
+logger.debug(f"API prefix is: {settings.API_V1_STR}")
+
+# Reject oversized bodies before the form parser spools them. Added first so it
+# runs inside CORS and its 413s still carry CORS headers.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.REQUEST_MAX_BYTES,
+    limits={
+        f"{settings.API_V1_STR}/model/batch/": settings.BATCH_REQUEST_MAX_BYTES,
+        f"{settings.API_V1_STR}/assets/": settings.ASSET_REQUEST_MAX_BYTES,
+    },
+)
 
 # Configure CORS
 app.add_middleware(
@@ -22,19 +88,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "X-Request-ID", "Idempotent-Replayed", "ETag", "Content-Range", "Accept-Ranges"],
 )
 
-# Database events
-app.add_event_handler("startup", connect_to_mongo)
-app.add_event_handler("shutdown", close_mongo_connection)
+# Outermost, so request timing includes CORS handling and the full response body
+app.add_middleware(TracingMiddleware)
 
 # Include routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
-# Print all registered routes
-print("\nRegistered routes:")
-for route in app.routes:
-    print(f"{route.path} [{route.methods}]") 
+@app.get("/health")
+async def health():
+    """
+    Liveness plus the last MongoDB health check and pool metrics
+    """
+    mongo = mongo_status()
+    return {
+        "status": "ok" if mongo["healthy"] else "degraded",
+        "mongo": mongo,
+    }
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """
+        Prometheus exposition of request and stage latency histograms
+        """
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# Log all registered routes
+if logger.isEnabledFor(logging.DEBUG):
+    logger.debug("Registered routes: " + ", ".join(
+        f"{route.path} {sorted(getattr(route, 'methods', None) or [])}" for route in app.routes
+    ))
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
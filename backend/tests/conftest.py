@@ -0,0 +1,101 @@
+import operator
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+# Settings are read at import time, so the required ones get test values first
+for name in (
+    "ALLOWED_HOSTS", "CORS_ALLOWED_ORIGINS", "LANGSMITH_ENDPOINT", "LANGSMITH_API_KEY",
+    "LANGSMITH_PROJECT", "OPENAI_API_KEY", "MONGODB_DB_NAME",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+os.environ.setdefault("MONGODB_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("ASSET_STORE_DIR", tempfile.mkdtemp(prefix="assets-test-"))
+
+COMPARISONS = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+    "$ne": operator.ne,
+}
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """
+    The subset of Mongo's query language the services use: equality, comparisons,
+    $and and $or
+    """
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, item) for item in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, item) for item in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            if not all(COMPARISONS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def sort(self, key, direction: int = 1):
+        keys = [(key, direction)] if isinstance(key, str) else key
+        # Stable sorts applied last key first give a multi-key sort
+        for field, field_direction in reversed(keys):
+            self.docs.sort(key=lambda doc: doc[field], reverse=field_direction < 0)
+        return self
+
+    def limit(self, count: int):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.docs[:length]
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        found = []
+        for doc in self.docs:
+            if matches(doc, query or {}):
+                if projection:
+                    doc = {key: value for key, value in doc.items() if key == "_id" or key in projection}
+                found.append(dict(doc))
+        return FakeCursor(found)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name: str) -> FakeCollection:
+        collection = self[name] = FakeCollection()
+        return collection
+
+
+@pytest.fixture
+def fake_db(monkeypatch) -> FakeDatabase:
+    """
+    An in-memory stand-in for the Mongo database used by the listing services
+    """
+    from app.services import marketplace, users
+
+    db = FakeDatabase()
+
+    async def get_database():
+        return db
+
+    monkeypatch.setattr(users, "get_database", get_database)
+    monkeypatch.setattr(marketplace, "get_database", get_database)
+    return db
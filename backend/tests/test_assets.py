@@ -0,0 +1,124 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1.endpoints import assets
+from app.core.config import settings
+from app.core.security import create_access_token
+
+# A GLB header followed by enough bytes to take ranges from
+GLB = b"glTF" + bytes(range(256)) * 64
+
+app = FastAPI()
+app.include_router(assets.router, prefix=f"{settings.API_V1_STR}/assets")
+
+
+def request(method: str, url: str, **kwargs) -> httpx.Response:
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+
+    return asyncio.run(main())
+
+
+def auth_headers():
+    return {"Authorization": f"Bearer {create_access_token({'user_id': 'tester', 'username': 'tester'})}"}
+
+
+@pytest.fixture(scope="module")
+def stored():
+    response = request("POST", "/v1/assets/", files={"file": ("plant.glb", GLB)}, headers=auth_headers())
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_upload_requires_token():
+    response = request("POST", "/v1/assets/", files={"file": ("plant.glb", GLB)})
+    assert response.status_code == 401
+
+
+def test_upload_rejects_invalid_token():
+    response = request(
+        "POST", "/v1/assets/", files={"file": ("plant.glb", GLB)},
+        headers={"Authorization": "Bearer not-a-token"}
+    )
+    assert response.status_code == 401
+
+
+def test_upload_is_content_addressed(stored):
+    assert stored["size"] == len(GLB)
+    assert stored["content_type"] == "model/gltf-binary"
+    assert os.path.basename(stored["url"]) == stored["sha256"]
+
+    again = request("POST", "/v1/assets/", files={"file": ("copy.glb", GLB)}, headers=auth_headers())
+    assert again.json()["sha256"] == stored["sha256"]
+
+
+def test_full_body_with_validators(stored):
+    response = request("GET", stored["url"])
+    assert response.status_code == 200
+    assert response.content == GLB
+    assert response.headers["etag"] == f'"{stored["sha256"]}"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+
+
+@pytest.mark.parametrize("if_none_match", [
+    "{etag}",
+    "W/{etag}",
+    '"other", {etag}',
+    "*",
+])
+def test_if_none_match_returns_304(stored, if_none_match):
+    etag = f'"{stored["sha256"]}"'
+    response = request("GET", stored["url"], headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_if_none_match_mismatch_returns_body(stored):
+    response = request("GET", stored["url"], headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.content == GLB
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=100-", 100, len(GLB) - 1),
+    ("bytes=-50", len(GLB) - 50, len(GLB) - 1),
+    ("bytes=10-999999", 10, len(GLB) - 1),
+])
+def test_range_returns_partial_content(stored, header, start, end):
+    response = request("GET", stored["url"], headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == GLB[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(GLB)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+def test_unsatisfiable_range_returns_416(stored):
+    response = request("GET", stored["url"], headers={"Range": f"bytes={len(GLB)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(GLB)}"
+
+
+def test_stale_if_range_ignores_range(stored):
+    response = request("GET", stored["url"], headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == GLB
+
+
+def test_head_has_no_body(stored):
+    response = request("HEAD", stored["url"], headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.content == b""
+    assert response.headers["content-length"] == "10"
+
+
+def test_missing_asset_returns_404():
+    assert request("GET", "/v1/assets/" + "0" * 64).status_code == 404
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import LRUCache, ReadThroughCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.evictions == 1
+
+
+def test_concurrent_misses_share_one_load():
+    loads = []
+
+    async def loader(key):
+        loads.append(key)
+        await asyncio.sleep(0.01)
+        return key * 2
+
+    async def main():
+        cache = ReadThroughCache(loader)
+        results = await asyncio.gather(*(cache.get(21) for _ in range(5)))
+        assert results == [42] * 5
+        assert await cache.get(21) == 42
+        return cache
+
+    cache = asyncio.run(main())
+    assert loads == [21]
+    assert cache.coalesced == 4
+
+
+def test_follower_survives_leader_cancellation():
+    async def loader(key):
+        await asyncio.sleep(0.05)
+        return key * 2
+
+    async def main():
+        cache = ReadThroughCache(loader)
+        leader = asyncio.create_task(cache.get(1))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(cache.get(1))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await follower == 2
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The load finished for the follower, so it was cached as well
+        assert await cache.get(1) == 2
+        return cache
+
+    cache = asyncio.run(main())
+    assert cache.loads == 1
+
+
+def test_failed_load_is_not_cached():
+    calls = []
+
+    async def loader(key):
+        calls.append(key)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return "loaded"
+
+    async def main():
+        cache = ReadThroughCache(loader)
+        with pytest.raises(RuntimeError):
+            await cache.get("key")
+        return await cache.get("key")
+
+    assert asyncio.run(main()) == "loaded"
+    assert len(calls) == 2
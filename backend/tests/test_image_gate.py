@@ -0,0 +1,54 @@
+import io
+
+import pytest
+from PIL import Image, ImageOps
+
+from app.services.image_gate import check_image, gate_thresholds
+
+WIDTH, HEIGHT = 640, 480
+
+
+def textured_image(dark, light) -> bytes:
+    """
+    A sharp noise texture between two colours, saved as a JPEG
+    """
+    noise = Image.effect_noise((WIDTH, HEIGHT), 64)
+    image = ImageOps.colorize(noise, black=dark, white=light)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def gate(data: bytes):
+    return check_image(data, WIDTH, HEIGHT, gate_thresholds())
+
+
+@pytest.mark.parametrize("dark, light", [
+    ((20, 70, 15), (110, 210, 70)),     # foliage
+    ((90, 5, 15), (240, 40, 60)),       # red petals
+    ((50, 10, 70), (170, 60, 210)),     # purple petals
+    ((120, 100, 0), (250, 230, 40)),    # yellow fruit
+])
+def test_plants_pass(dark, light):
+    result = gate(textured_image(dark, light))
+    assert result.passed, result.reasons
+
+
+def test_red_flower_counts_as_bloom_not_foliage():
+    metrics = gate(textured_image((90, 5, 15), (240, 40, 60))).metrics
+    assert metrics["bloom_fraction"] > metrics["foliage_fraction"]
+
+
+@pytest.mark.parametrize("dark, light", [
+    ((60, 60, 60), (180, 180, 180)),    # grey wall
+    ((40, 110, 190), (140, 190, 245)),  # sky
+])
+def test_non_plants_rejected(dark, light):
+    assert "no_plant_detected" in gate(textured_image(dark, light)).reasons
+
+
+def test_flat_colour_rejected():
+    image = Image.new("RGB", (WIDTH, HEIGHT), (200, 20, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    assert not gate(buffer.getvalue()).passed
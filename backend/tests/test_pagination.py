@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services.marketplace import (
+    InvalidMarketplaceQuery, MarketplaceService, decode_cursor, encode_cursor
+)
+from app.services.users import InvalidCursor, UserService
+
+
+def collect_pages(fetch):
+    """
+    Follow next cursors from the first page to the last, returning every item
+    """
+    async def main():
+        items, cursor = await fetch(None)
+        pages = 1
+        while cursor is not None:
+            page, cursor = await fetch(cursor)
+            items.extend(page)
+            pages += 1
+        return items, pages
+
+    return asyncio.run(main())
+
+
+def test_users_pages_cover_every_user_once(fake_db):
+    ids = [ObjectId() for _ in range(25)]
+    fake_db["users"].docs = [
+        {"_id": user_id, "username": f"user{i}", "email": f"user{i}@example.com", "password": "hash"}
+        for i, user_id in enumerate(ids)
+    ]
+
+    users, pages = collect_pages(lambda after: UserService.get_all_users(limit=10, after=after))
+
+    assert [user["id"] for user in users] == [str(user_id) for user_id in sorted(ids)]
+    assert pages == 3
+    assert all("password" not in user for user in users)
+
+
+def test_users_invalid_cursor(fake_db):
+    with pytest.raises(InvalidCursor):
+        asyncio.run(UserService.get_all_users(after="not-an-object-id"))
+
+
+@pytest.mark.parametrize("sort_value", [42, 3.5, "name", datetime(2026, 1, 2, 3, 4, 5, 6789)])
+def test_marketplace_cursor_round_trip(sort_value):
+    object_id = ObjectId()
+    assert decode_cursor(encode_cursor(sort_value, object_id)) == (sort_value, object_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "WzEsMl0=", "eyJhIjogMX0="])
+def test_marketplace_invalid_cursor(cursor):
+    with pytest.raises(InvalidMarketplaceQuery):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("sort_by", ["created_at", "price", "score"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_marketplace_pages_cover_every_listing_once(fake_db, sort_by, descending):
+    # Few distinct sort values, so most pages split a run of ties on _id
+    start = datetime(2026, 1, 1)
+    fake_db["models"].docs = [
+        {
+            "_id": ObjectId(),
+            "owner_id": f"user{i % 3}",
+            "price": i % 4,
+            "score": float(i % 5),
+            "created_at": start + timedelta(seconds=i % 6),
+        }
+        for i in range(37)
+    ]
+    expected = sorted(
+        fake_db["models"].docs, key=lambda doc: (doc[sort_by], doc["_id"]), reverse=descending
+    )
+    expected_ids = [str(doc["_id"]) for doc in expected]
+
+    items, pages = collect_pages(lambda cursor: MarketplaceService.list_models(
+        {}, sort_by=sort_by, descending=descending, limit=5, cursor=cursor
+    ))
+
+    assert [item["id"] for item in items] == expected_ids
+    assert pages == 8
+
+
+def test_marketplace_pages_respect_filters(fake_db):
+    fake_db["models"].docs = [
+        {"_id": ObjectId(), "owner_id": f"user{i % 2}", "price": i, "score": 50.0, "created_at": datetime(2026, 1, 1)}
+        for i in range(20)
+    ]
+    query = MarketplaceService.build_query(exclude_owner="user0", min_price=5)
+
+    items, _ = collect_pages(lambda cursor: MarketplaceService.list_models(
+        dict(query), sort_by="price", descending=False, limit=3, cursor=cursor
+    ))
+
+    assert [item["price"] for item in items] == [5, 7, 9, 11, 13, 15, 17, 19]